@@ -0,0 +1,187 @@
+from time import perf_counter
+import click
+import json
+import numpy as np
+import platform
+import sys
+
+from card import DECK_SIZE, evaluate_batch, get_best_hand, get_hand, parse_cards
+from player import Player
+from poker_round import Round
+from seat import Seat
+
+
+_golden_path = "golden_hands.json"
+
+
+def _seats_for(hole_cards):
+    seats = []
+    for index, (card_1, card_2) in enumerate(hole_cards):
+        seat = Seat(Player(), index, 0)
+        seat.set_card_1(card_1)
+        seat.set_card_2(card_2)
+        seats.append(seat)
+
+    return seats
+
+
+def showdown_winners(board, hole_cards):
+    seats = _seats_for(hole_cards)
+    poker_round = Round(seats, 0, 1)
+    poker_round.cards = list(board)
+    return [seat.index for seat in poker_round.winners_from_remaining(seats)]
+
+
+def deal_corpus(seed, num_deals, num_cards):
+    rng = np.random.default_rng(seed)
+    return np.argsort(rng.random((num_deals, DECK_SIZE)), axis=1)[:, :num_cards]
+
+
+def _time(function, calls, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+
+    return {"calls": calls, "seconds": best, "per_second": calls / best}
+
+
+def run_benchmarks(seed, num_hands, repeats):
+    results = dict()
+
+    five_card_sets = deal_corpus(seed, num_hands, 5).tolist()
+    results["get_hand"] = _time(
+        lambda: [get_hand(card_set) for card_set in five_card_sets],
+        num_hands,
+        repeats
+    )
+
+    seven_card_sets = deal_corpus(seed + 1, num_hands, 7)
+    seven_card_lists = seven_card_sets.tolist()
+    results["get_best_hand"] = _time(
+        lambda: [get_best_hand(card_set[:2], card_set[2:]) for card_set in seven_card_lists],
+        num_hands,
+        repeats
+    )
+
+    results["evaluate_batch"] = _time(lambda: evaluate_batch(seven_card_sets), num_hands, repeats)
+
+    for num_players in range(2, 11):
+        deals = deal_corpus(seed + num_players, num_hands // num_players, 5 + 2 * num_players).tolist()
+        rounds = []
+        for deal in deals:
+            seats = _seats_for(zip(deal[5::2], deal[6::2]))
+            poker_round = Round(seats, 0, 1)
+            poker_round.cards = deal[:5]
+            rounds.append((poker_round, seats))
+
+        results["showdown_{}".format(num_players)] = _time(
+            lambda: [poker_round.winners_from_remaining(seats) for poker_round, seats in rounds],
+            len(rounds),
+            repeats
+        )
+
+    return results
+
+
+def check_golden(path):
+    with open(path) as golden_file:
+        golden = json.load(golden_file)
+
+    failures = []
+
+    for case in golden["hands"]:
+        cards = parse_cards(case["cards"])
+        category = type(get_best_hand(cards[:2], cards[2:]).view()).__name__
+        if category != case["category"]:
+            failures.append("{}: expected {}, got {}".format(case["cards"], case["category"], category))
+
+    for case in golden["orderings"]:
+        lower = parse_cards(case["lower"])
+        higher = parse_cards(case["higher"])
+        if not get_best_hand(lower[:2], lower[2:]) < get_best_hand(higher[:2], higher[2:]):
+            failures.append("{} should lose to {}".format(case["lower"], case["higher"]))
+
+    for case in golden["ties"]:
+        first = parse_cards(case["first"])
+        second = parse_cards(case["second"])
+        if get_best_hand(first[:2], first[2:]) != get_best_hand(second[:2], second[2:]):
+            failures.append("{} should tie with {}".format(case["first"], case["second"]))
+
+    for case in golden["showdowns"]:
+        board = parse_cards(case["board"])
+        hole_cards = [parse_cards(hand) for hand in case["players"]]
+        winners = showdown_winners(board, hole_cards)
+        batch_scores = evaluate_batch([[*hand, *board] for hand in hole_cards])
+        batch_winners = [index for index, score in enumerate(batch_scores) if score == batch_scores.max()]
+
+        if winners != case["winners"] or batch_winners != case["winners"]:
+            failures.append("{} {}: expected winners {}, got {} (batch {})".format(
+                case["board"],
+                case["players"],
+                case["winners"],
+                winners,
+                batch_winners
+            ))
+
+    return failures
+
+
+@click.group()
+def main():
+    pass
+
+
+@main.command()
+@click.option("--seed", default=0, help="Seed for the dealt corpus")
+@click.option("--num_hands", default=100000, help="Hands per benchmark")
+@click.option("--repeats", default=3, help="Repeats per benchmark, the fastest is kept")
+@click.option("--output", default=None, help="JSON file to write the results to")
+def run(seed, num_hands, repeats, output):
+    results = run_benchmarks(seed, num_hands, repeats)
+
+    for name, result in results.items():
+        print("{:>16s} {:>12.0f}/s {:>10.4f}s".format(name, result["per_second"], result["seconds"]))
+
+    if output:
+        with open(output, "w") as output_file:
+            json.dump({
+                "python": sys.version,
+                "machine": platform.machine(),
+                "seed": seed,
+                "num_hands": num_hands,
+                "results": results,
+            }, output_file, indent=4)
+
+
+@main.command()
+@click.argument("baseline", type=click.Path(exists=True))
+@click.argument("candidate", type=click.Path(exists=True))
+def compare(baseline, candidate):
+    with open(baseline) as baseline_file, open(candidate) as candidate_file:
+        baseline_results = json.load(baseline_file)["results"]
+        candidate_results = json.load(candidate_file)["results"]
+
+    for name, result in candidate_results.items():
+        if name in baseline_results:
+            speedup = result["per_second"] / baseline_results[name]["per_second"]
+            print("{:>16s} {:>8.2f}x".format(name, speedup))
+
+
+@main.command()
+@click.option("--golden", default=_golden_path, help="Golden results corpus")
+def check(golden):
+    failures = check_golden(golden)
+
+    for failure in failures:
+        print(failure)
+
+    if failures:
+        sys.exit(1)
+
+    print("All golden results match")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
-from collections import deque
 import logging
 
-from turn import Turn
+from events import ActionEvent, PotMoveEvent, UncontestedEvent, emit, subscribers
+from turn import Turn, play_steps
 from action import *
 from exception import IllegalActionException
 
@@ -12,103 +12,109 @@ class BettingRound:
 
     def __init__(self, seats, remaining_seats, cards, bet=0):
         self.LOGGER.debug("NEW BETTING ROUND")
-        self.seats = deque(seats)
+        self.seats = seats
         self.remaining_seats = remaining_seats
-        self.filtered_seats = deque(remaining_seats)
+        self.state = seats[0].state
         self.cards = cards
         self.current_bet = bet
 
+    def first_to_act(self):
+        return self.state.first_active()
+
     def play(self):
+        return play_steps(self.steps())
+
+    def steps(self):
+        state = self.state
         last_action = None
-        self.end_seat = self.filtered_seats[-1]
-        self.align_seat_deques()
+        acting = self.first_to_act()
+        self.end_seat = state.previous_active[acting]
 
         while True:
-            seat = self.filtered_seats[0]
-
             turn = Turn(
-                self.seats,
-                self.filtered_seats,
+                state,
+                acting,
                 self.cards,
                 self.current_bet,
                 last_action,
             )
 
-            action = turn.play()
+            action = yield from turn.steps()
 
             if action:
                 last_action = action
-                self.resolve_action(seat, action)
+                self.resolve_action(acting, action)
+
+            if state.num_active == 1:
+                winners = state.active_seats()
+                if subscribers:
+                    emit(UncontestedEvent(winners[0].index))
 
-            if len(self.filtered_seats) == 1:
-                self.LOGGER.debug("Player {} wins".format(self.filtered_seats[0].index))
                 self.move_all_bets_to_pots()
-                return list(self.filtered_seats)
+                return winners
 
-            if seat is self.end_seat:
+            if acting == self.end_seat:
                 # bets have been called
                 self.move_all_bets_to_pots()
-                return [seat for seat in self.remaining_seats if seat in self.filtered_seats]
-
-            self.filtered_seats.rotate(-1)
-            self.align_seat_deques()
+                return state.active_seats()
 
-    def align_seat_deques(self):
-        while self.seats[0] != self.filtered_seats[0]:
-            self.seats.rotate(-1)
+            acting = state.next_active[acting]
 
     def move_all_bets_to_pots(self):
-        for seat in self.seats:
-            seat.move_bet_to_pot()
+        self.state.move_bets_to_pots()
+
+    def resolve_action(self, index, action):
+        state = self.state
 
-    def resolve_action(self, seat, action):
         if isinstance(action, Fold):
-            del self.filtered_seats[0]
-            self.filtered_seats.rotate()
-            self.LOGGER.debug("Player {} folds".format(seat.index))
+            state.fold(index)
+            amount = 0
         elif isinstance(action, CheckCall):
-            call_amount = self.current_bet - seat.bet
-            call_amount = seat.bet_chips(call_amount)
-
-            if call_amount == 0:
-                self.LOGGER.debug("Player {} checks".format(seat.index))
-            else:
-                self.LOGGER.debug("Player {} calls, putting in {}".format(seat.index, call_amount))
+            call_amount = self.current_bet - state.bets[index]
+            amount = state.bet_chips(index, call_amount)
+            if subscribers:
+                emit(PotMoveEvent(index, amount))
         elif isinstance(action, Raise):
-            self.LOGGER.debug("Player {} attempts to raise {}".format(seat.index, action.amount))
+            chips = state.chips[index]
 
-            if seat.chips == 0:
+            if chips == 0:
                 raise IllegalActionException(
-                    "Seat {} cannot raise with 0 chips".format(seat.index)
+                    "Seat {} cannot raise with 0 chips".format(index)
                 )
 
-            if seat.chips < self.current_bet:
+            if chips < self.current_bet:
                 raise IllegalActionException(
                     "Seat {} cannot raise with {} chips when bet is {}".format(
-                        seat.index,
-                        seat.chips,
+                        index,
+                        chips,
                         self.current_bet
                     )
                 )
 
-            if action.amount < self.current_bet and action.amount < seat.chips:
+            if action.amount < self.current_bet and action.amount < chips:
                 raise IllegalActionException(
                     "Seat {}, chips {} - Must raise at least current bet ({})".format(
-                        seat.index,
-                        seat.chips,
+                        index,
+                        chips,
                         self.current_bet
                     )
                 )
 
-            self.end_seat = self.filtered_seats[-1]
+            self.end_seat = state.previous_active[index]
 
-            call_amount = self.current_bet - seat.bet
-            seat.bet_chips(call_amount)
+            call_amount = self.current_bet - state.bets[index]
+            called = state.bet_chips(index, call_amount)
+            raise_amount = state.bet_chips(index, action.amount)
+
+            if subscribers:
+                emit(PotMoveEvent(index, called))
+                emit(PotMoveEvent(index, raise_amount))
 
-            raise_amount = seat.bet_chips(action.amount)
             self.current_bet += raise_amount
+            amount = raise_amount
 
-            self.LOGGER.debug("Player {} raises {}".format(seat.index, raise_amount))
+        if subscribers:
+            emit(ActionEvent(index, action, amount))
 
 
 class PreFlop(BettingRound):
@@ -116,7 +122,7 @@ class PreFlop(BettingRound):
     def __init__(self, seats, remaining_seats, cards, big_blind):
         super().__init__(seats, remaining_seats, cards, big_blind)
 
-    def play(self):
-        # start left of small blind
-        self.filtered_seats.rotate(-3)
-        return super().play()
+    def first_to_act(self):
+        # start left of the big blind
+        order = self.state.order
+        return order[3 % len(order)]
@@ -1,5 +1,5 @@
-from random import randint
 import logging
+import numpy as np
 
 
 class Blinds:
@@ -8,7 +8,11 @@ class Blinds:
     INCREASE_VARIANCE = 3
     INITIAL_BLINDS = [25, 50, 100, 200, 500, 1000, 1500, 2000, 5000, 10000]
 
-    def __init__(self, buy_in):
+    def __init__(self, buy_in, rng=None):
+        if rng is None:
+            rng = np.random.default_rng()
+
+        self.rng = rng
         self.counter = 0
         self.increases = 0
         self.small_blind = self.initial_blinds()[0]
@@ -36,7 +40,7 @@ class Blinds:
         return self.counter >= self.INCREASE_FREQUENCY - self.INCREASE_VARIANCE
 
     def check_for_blind_increase(self):
-        return randint(0, self.INCREASE_VARIANCE + self.INCREASE_FREQUENCY - self.counter) == 0
+        return self.rng.integers(0, self.INCREASE_VARIANCE + self.INCREASE_FREQUENCY - self.counter + 1) == 0
 
     def next_blinds(self):
         self.increases += 1
@@ -45,3 +49,10 @@ class Blinds:
             return self.small_blind
         else:
             return self.initial_blinds()[self.increases]
+
+
+class TurboBlinds(Blinds):
+
+    # the same levels reached in roughly half as many hands
+    INCREASE_FREQUENCY = 6
+    INCREASE_VARIANCE = 2
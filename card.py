@@ -1,15 +1,19 @@
+from collections import OrderedDict
 from enum import Enum
-from itertools import combinations
+from itertools import combinations_with_replacement
 from random import shuffle
+import numpy as np
 
 
 class Card:
 
     NUMBERS = range(1, 14)
+    NUMBERS_INT = range(13)
 
     def __init__(self, suit, number):
         self.suit = suit
         self.number = number
+        self.value = card_value(suit.int_value, number.int_value)
 
     def __str__(self):
         return "{}{}".format(self.number.print_value, self.suit.print_value)
@@ -48,51 +52,148 @@ class Number(PrintIntEnum):
     ACE = (12, "A")
 
 
+# cards are passed around the engine as ints in [0, 52); the number is held
+# in the high bits so that ordering cards by value orders them by number
+_SUIT_BITS = 2
+_SUIT_MASK = (1 << _SUIT_BITS) - 1
+
+
+def card_value(suit, number):
+    return number << _SUIT_BITS | suit
+
+
+def card_suit(card):
+    return card & _SUIT_MASK
+
+
+def card_number(card):
+    return card >> _SUIT_BITS
+
+
+_NUMBERS_BY_VALUE = sorted(Number, key=lambda number: number.int_value)
+CARDS = sorted((Card(suit, number) for suit in Suit for number in Number), key=lambda card: card.value)
+DECK_SIZE = len(CARDS)
+
+
+_NUMBER_LETTERS = "23456789TJQKA"
+_SUIT_LETTERS = "shdc"
+
+
+def parse_card(text):
+    number_text, suit_text = text[:-1].upper(), text[-1].lower()
+    if number_text == "10":
+        number_text = "T"
+
+    if len(number_text) != 1 or number_text not in _NUMBER_LETTERS or suit_text not in _SUIT_LETTERS:
+        raise ValueError("Cannot parse card {!r}".format(text))
+
+    return card_value(_SUIT_LETTERS.index(suit_text), _NUMBER_LETTERS.index(number_text))
+
+
+def parse_cards(text):
+    return [parse_card(card_text) for card_text in text.split()]
+
+
+def card_to_string(card):
+    return str(CARDS[card])
+
+
+def cards_to_string(cards):
+    return " ".join(str(CARDS[card]) for card in cards)
+
+
 class Deck:
 
-    def __init__(self):
-        self.cards = []
-        for suit in Suit:
-            for number in Number:
-                card = Card(suit, number)
-                self.cards.append(card)
+    def __init__(self, cards=None):
+        if cards is None:
+            cards = list(range(DECK_SIZE))
 
-    def shuffle(self):
-        shuffle(self.cards)
+        self.cards = cards
+
+    def shuffle(self, rng=None):
+        if rng is None:
+            shuffle(self.cards)
+        else:
+            rng.shuffle(self.cards)
 
     def deal(self):
         return self.cards.pop()
 
 
+class DeckBuffer:
+
+    def __init__(self, rng, size=64, limit=None):
+        # decks are permuted a chunk at a time and dealt in the order they
+        # were drawn, so the decks don't depend on the chunk size; with a
+        # limit on how many will be dealt, no chunk goes past it
+        self.rng = rng
+        self.size = size
+        self.limit = limit
+        self.dealt = 0
+        self.orders = []
+
+    def refill(self):
+        size = self.size
+        if self.limit is not None:
+            size = max(1, min(size, self.limit - self.dealt))
+
+        ordered = np.broadcast_to(np.arange(DECK_SIZE, dtype=np.int8), (size, DECK_SIZE))
+        self.orders = self.rng.permuted(ordered, axis=1).tolist()
+        self.orders.reverse()
+
+    def next_deck(self):
+        if not self.orders:
+            self.refill()
+
+        self.dealt += 1
+        return Deck(self.orders.pop())
+
+
 class Hand:
 
-    def __init__(self, *args):
-        self.cards = list(args)
+    __slots__ = ("strength", "_view")
+
+    def __init__(self, strength):
+        self.strength = strength
+        self._view = None
 
     def __lt__(self, other):
-        if self.rank() == other.rank():
-            return self.less_than(other)
-        else:
-            return self.rank() < other.rank()
+        return self.strength < other.strength
 
     def __eq__(self, other):
-        return not self < other and not other < self
+        return self.strength == other.strength
+
+    def __hash__(self):
+        return hash(self.strength)
+
+    def __str__(self):
+        return str(self.view())
+
+    def rank(self):
+        return _score_category(self.strength)
+
+    def view(self):
+        if self._view is None:
+            self._view = _hand_view(self.strength)
 
-    def less_than(self, other):
-        for card_1, card_2 in zip(self.cards, other.cards):
-            if card_1 < card_2:
-                return True
-            if card_1 > card_2:
-                return False
+        return self._view
 
-        return False
+
+class HandView:
+
+    def __init__(self, *args):
+        self.cards = list(args)
+
+    def __str__(self):
+        numbers = " ".join(_NUMBERS_BY_VALUE[number].print_value for number in self.cards)
+        return "{} {}".format(type(self).__name__, numbers).strip()
 
     @classmethod
     def rank(cls):
         return cls._rank
 
 
-class RoyalFlush(Hand):
+class RoyalFlush(HandView):
 
     _rank = 9
 
@@ -100,7 +201,7 @@ class RoyalFlush(Hand):
         super().__init__()
 
 
-class StraightFlush(Hand):
+class StraightFlush(HandView):
 
     _rank = 8
 
@@ -108,7 +209,7 @@ class StraightFlush(Hand):
         super().__init__(highest_card)
 
 
-class FourOfAKind(Hand):
+class FourOfAKind(HandView):
 
     _rank = 7
 
@@ -116,7 +217,7 @@ class FourOfAKind(Hand):
         super().__init__(four, high_card)
 
 
-class FullHouse(Hand):
+class FullHouse(HandView):
 
     _rank = 6
 
@@ -124,12 +225,12 @@ class FullHouse(Hand):
         super().__init__(three, pair)
 
 
-class Flush(Hand):
+class Flush(HandView):
 
     _rank = 5
 
 
-class Straight(Hand):
+class Straight(HandView):
 
     _rank = 4
 
@@ -138,15 +239,15 @@ class Straight(Hand):
         super().__init__(highest_card)
 
 
-class ThreeOfAKind(Hand):
+class ThreeOfAKind(HandView):
 
     _rank = 3
 
     def __init__(self, three, cards):
-        super().__init__(three, cards)
+        super().__init__(three, *cards)
 
 
-class TwoPair(Hand):
+class TwoPair(HandView):
 
     _rank = 2
 
@@ -154,7 +255,7 @@ class TwoPair(Hand):
         super().__init__(high_pair, low_pair, single)
 
 
-class OnePair(Hand):
+class OnePair(HandView):
 
     _rank = 1
 
@@ -162,148 +263,315 @@ class OnePair(Hand):
         super().__init__(pair, *cards)
 
 
-class HighCards(Hand):
+class HighCards(HandView):
 
     _rank = 0
 
 
-def get_best_hand(hole_cards, community_cards):
-    cards = [*hole_cards, *community_cards]
-    card_combinations = [list(card_set) for card_set in combinations(cards, 5)]
+_CATEGORY_SHIFT = 20
+_KICKER_SHIFT = 4
+_RANK_COUNT_SHIFT = 3
+_SUIT_COUNT_OFFSET = 13 * _RANK_COUNT_SHIFT
+_RANK_KEY_MASK = (1 << _SUIT_COUNT_OFFSET) - 1
+_WHEEL_MASK = 0b1000000001111
 
-    hand = get_hand(card_combinations[0])
-    for card_set in card_combinations[1:]:
-        new_hand = get_hand(card_set)
-        hand = max(hand, new_hand)
 
-    return hand
+def _make_score(category, ranks):
+    score = category
+    for index in range(5):
+        score <<= _KICKER_SHIFT
+        if index < len(ranks):
+            score |= ranks[index]
 
+    return score
 
-def get_hand(card_set):
-    card_set.sort(reverse=True)
 
-    number_counts = get_number_distribution(card_set)
+def _score_category(score):
+    return score >> _CATEGORY_SHIFT
 
-    four_of_a_kind = get_four_of_a_kind(number_counts)
-    if four_of_a_kind:
-        return four_of_a_kind
 
-    full_house = get_full_house(number_counts)
-    if full_house:
-        return full_house
+def _score_ranks(score):
+    return [(score >> (_KICKER_SHIFT * index)) & 0xF for index in range(4, -1, -1)]
 
-    three_of_a_kind = get_three_of_a_kind(number_counts)
-    if three_of_a_kind:
-        return three_of_a_kind
 
-    two_pairs = get_two_pairs(number_counts)
-    if two_pairs:
-        return two_pairs
+def _straight_high(rank_mask):
+    for high in range(Number.ACE.int_value, Number.FIVE.int_value, -1):
+        straight_mask = 0b11111 << (high - 4)
+        if rank_mask & straight_mask == straight_mask:
+            return high
 
-    pair = get_pair(number_counts)
-    if pair:
-        return pair
+    if rank_mask & _WHEEL_MASK == _WHEEL_MASK:
+        return Number.FIVE.int_value
 
-    flush = get_flush(card_set)
-    straight = get_straight(card_set)
+    return None
 
-    if flush and straight and card_set[0].number.int_value == Number.ACE:
-        return RoyalFlush()
 
-    if flush and straight:
-        return StraightFlush(straight.highest_card)
+def _mask_ranks(rank_mask):
+    return [rank for rank in reversed(Card.NUMBERS_INT) if rank_mask >> rank & 1]
 
-    if flush:
-        return flush
 
-    if straight:
-        return straight
+def _flush_score(rank_mask):
+    straight_high = _straight_high(rank_mask)
 
-    return HighCards([card.number.int_value for card in card_set])
+    if straight_high == Number.ACE.int_value:
+        return _make_score(RoyalFlush.rank(), [straight_high])
 
+    if straight_high is not None:
+        return _make_score(StraightFlush.rank(), [straight_high])
 
-def get_number_distribution(card_set):
-    number_counts = dict()
+    return _make_score(Flush.rank(), _mask_ranks(rank_mask)[:5])
 
-    for card in card_set:
-        try:
-            number_counts[card.number.int_value] += 1
-        except KeyError:
-            number_counts[card.number.int_value] = 1
 
-    return number_counts
+def _count_score(counts):
+    present = []
+    groups = ([], [], [], [], [])
+    for rank in reversed(Card.NUMBERS_INT):
+        count = counts[rank]
+        if count:
+            present.append(rank)
+            groups[count].append(rank)
 
+    _, _, pairs, trips, quads = groups
 
-def get_four_of_a_kind(number_counts):
-    if 4 in number_counts.values():
-        four, = [number for number, count in number_counts.items() if count == 4]
-        high_card = list(number_counts.keys())
-        high_card.remove(four)
-        return FourOfAKind(four, high_card)
+    if quads:
+        four = quads[0]
+        kicker = [rank for rank in present if rank != four][0]
+        return _make_score(FourOfAKind.rank(), [four, kicker])
 
-    return None
+    if trips and len(trips) + len(pairs) > 1:
+        three = trips[0]
+        pair = max(trips[1:] + pairs)
+        return _make_score(FullHouse.rank(), [three, pair])
 
+    if len(present) >= 5:
+        rank_mask = 0
+        for rank in present:
+            rank_mask |= 1 << rank
 
-def get_full_house(number_counts):
-    if 2 in number_counts.values() and 3 in number_counts.values():
-        triple, = [number for number, count in number_counts.items() if count == 3]
-        pair = list(number_counts.keys())
-        pair.remove(triple)
-        return FullHouse(triple, pair)
+        straight_high = _straight_high(rank_mask)
+        if straight_high is not None:
+            return _make_score(Straight.rank(), [straight_high])
 
-    return None
+    if trips:
+        three = trips[0]
+        kickers = [rank for rank in present if rank != three][:2]
+        return _make_score(ThreeOfAKind.rank(), [three, *kickers])
 
+    if len(pairs) > 1:
+        high_pair, low_pair = pairs[:2]
+        kicker = [rank for rank in present if rank not in (high_pair, low_pair)][0]
+        return _make_score(TwoPair.rank(), [high_pair, low_pair, kicker])
 
-def get_three_of_a_kind(number_counts):
-    if 3 in number_counts.values():
-        triple, = [number for number, count in number_counts.items() if count == 3]
-        high_cards = list(number_counts.keys())
-        high_cards.remove(triple)
-        return ThreeOfAKind(triple, high_cards)
+    if pairs:
+        pair = pairs[0]
+        kickers = [rank for rank in present if rank != pair][:3]
+        return _make_score(OnePair.rank(), [pair, *kickers])
 
-    return None
+    return _make_score(HighCards.rank(), present[:5])
 
 
-def get_two_pairs(number_counts):
-    pairs = [number for number, count in number_counts.items() if count == 2]
+def _build_tables():
+    # non-flush hands only depend on how many of each number there are, so
+    # every 5 to 7 card multiset of numbers is scored once up front
+    number_keys = [1 << (_RANK_COUNT_SHIFT * number) for number in Card.NUMBERS_INT]
+    count_scores = dict()
+    for num_cards in range(5, 8):
+        for numbers in combinations_with_replacement(Card.NUMBERS_INT, num_cards):
+            counts = [0] * len(Card.NUMBERS_INT)
+            key = 0
+            for number in numbers:
+                counts[number] += 1
+                key += number_keys[number]
 
-    if len(pairs) == 2:
-        high_pair = max(pairs)
-        low_pair = min(pairs)
-        single, = [number for number, count in number_counts.items() if count == 1]
+            if max(counts) <= 4:
+                count_scores[key] = _count_score(counts)
 
-        return TwoPair(high_pair, low_pair, single)
+    # with at most 7 cards only one suit can hold five or more of them
+    flush_suits = [None] * (1 << (_RANK_COUNT_SHIFT * len(Suit)))
+    for key in range(len(flush_suits)):
+        for suit in Suit:
+            if (key >> (_RANK_COUNT_SHIFT * suit.int_value)) & 0b111 >= 5:
+                flush_suits[key] = suit.int_value
 
-    return None
+    flush_scores = [None] * (1 << len(Card.NUMBERS_INT))
+    for rank_mask in range(len(flush_scores)):
+        if bin(rank_mask).count("1") >= 5:
+            flush_scores[rank_mask] = _flush_score(rank_mask)
 
+    return count_scores, flush_suits, flush_scores
 
-def get_pair(number_counts):
-    pairs = [number for number, count in number_counts.items() if count == 2]
 
-    if len(pairs) == 1:
-        pair, = pairs
-        numbers = [number for number, count in number_counts.items() if count == 1]
+_COUNT_SCORES, _FLUSH_SUITS, _FLUSH_SCORES = _build_tables()
+_CARD_KEYS = [
+    (1 << (_RANK_COUNT_SHIFT * card_number(card))) +
+    (1 << (_SUIT_COUNT_OFFSET + _RANK_COUNT_SHIFT * card_suit(card)))
+    for card in range(DECK_SIZE)
+]
 
-        return OnePair(pair, numbers)
 
-    return None
+def evaluate(cards):
+    key = 0
+    for card in cards:
+        key += _CARD_KEYS[card]
 
+    flush_suit = _FLUSH_SUITS[key >> _SUIT_COUNT_OFFSET]
+    if flush_suit is None:
+        return _COUNT_SCORES[key & _RANK_KEY_MASK]
 
-def get_flush(card_set):
-    suits = set(card.suit for card in card_set)
-    if len(suits) == 1:
-        numbers = [cards.number.int_value for cards in card_set]
+    rank_mask = 0
+    for card in cards:
+        if card & _SUIT_MASK == flush_suit:
+            rank_mask |= 1 << (card >> _SUIT_BITS)
 
-        return Flush(numbers)
+    return _FLUSH_SCORES[rank_mask]
 
 
-def get_straight(card_set):
-    numbers = [card.number.int_value for card in card_set]
+_CARD_KEYS_ARRAY = np.array(_CARD_KEYS, dtype=np.int64)
+_COUNT_KEYS_ARRAY = np.array(sorted(_COUNT_SCORES), dtype=np.int64)
+_COUNT_SCORES_ARRAY = np.array([_COUNT_SCORES[key] for key in _COUNT_KEYS_ARRAY.tolist()], dtype=np.int64)
+_FLUSH_SUITS_ARRAY = np.array([-1 if suit is None else suit for suit in _FLUSH_SUITS], dtype=np.int64)
+_FLUSH_SCORES_ARRAY = np.array([0 if score is None else score for score in _FLUSH_SCORES], dtype=np.int64)
 
-    if numbers == [Number.ACE, Number.FIVE, Number.FOUR, Number.THREE, Number.TWO]:
-        return Straight(Number.FIVE)
+# one 16-bit number mask per suit, so the masks of disjoint cards can be summed
+_SUIT_BITS_WIDTH = 16
+_NUMBER_BITS_MASK = (1 << len(Card.NUMBERS_INT)) - 1
+_CARD_SUIT_BITS_ARRAY = np.array(
+    [1 << (_SUIT_BITS_WIDTH * card_suit(card) + card_number(card)) for card in range(DECK_SIZE)],
+    dtype=np.int64
+)
 
-    if all(number_1 - number_2 == 1 for number_1, number_2 in zip(numbers[:-1], numbers[1:])):
-        return Straight(numbers[0])
 
-    return None
+def batch_keys(cards):
+    cards = np.asarray(cards, dtype=np.intp)
+    return _CARD_KEYS_ARRAY[cards].sum(axis=-1), _CARD_SUIT_BITS_ARRAY[cards].sum(axis=-1)
+
+
+def evaluate_keys_batch(keys, suit_bits):
+    count_indices = np.searchsorted(_COUNT_KEYS_ARRAY, keys & _RANK_KEY_MASK)
+    scores = _COUNT_SCORES_ARRAY[count_indices]
+
+    flush_suits = _FLUSH_SUITS_ARRAY[keys >> _SUIT_COUNT_OFFSET]
+    flushed = flush_suits >= 0
+
+    if flushed.any():
+        rank_masks = (suit_bits[flushed] >> (_SUIT_BITS_WIDTH * flush_suits[flushed])) & _NUMBER_BITS_MASK
+        scores[flushed] = _FLUSH_SCORES_ARRAY[rank_masks]
+
+    return scores
+
+
+def evaluate_batch(cards):
+    return evaluate_keys_batch(*batch_keys(cards))
+
+
+def _hand_view(score):
+    category = _score_category(score)
+    ranks = _score_ranks(score)
+
+    if category == RoyalFlush.rank():
+        return RoyalFlush()
+    if category == StraightFlush.rank():
+        return StraightFlush(ranks[0])
+    if category == FourOfAKind.rank():
+        return FourOfAKind(ranks[0], ranks[1])
+    if category == FullHouse.rank():
+        return FullHouse(ranks[0], ranks[1])
+    if category == Flush.rank():
+        return Flush(*ranks)
+    if category == Straight.rank():
+        return Straight(ranks[0])
+    if category == ThreeOfAKind.rank():
+        return ThreeOfAKind(ranks[0], ranks[1:3])
+    if category == TwoPair.rank():
+        return TwoPair(*ranks[:3])
+    if category == OnePair.rank():
+        return OnePair(ranks[0], ranks[1:4])
+
+    return HighCards(*ranks)
+
+
+class HandCache:
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.reset_stats()
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    @staticmethod
+    def canonical_key(cards):
+        # a hand's strength doesn't change when suits are relabelled, so the
+        # sorted per-suit number masks identify every isomorphic card set
+        suit_masks = [0, 0, 0, 0]
+        for card in cards:
+            suit_masks[card & _SUIT_MASK] |= 1 << (card >> _SUIT_BITS)
+
+        suit_masks.sort()
+        return tuple(suit_masks)
+
+    def strength(self, cards):
+        key = self.canonical_key(cards)
+
+        try:
+            strength = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            strength = evaluate(cards)
+            self.entries[key] = strength
+
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+            return strength
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return strength
+
+
+_hand_cache = None
+
+
+def configure_hand_cache(max_size):
+    global _hand_cache
+
+    if max_size:
+        _hand_cache = HandCache(max_size)
+    else:
+        _hand_cache = None
+
+    return _hand_cache
+
+
+def get_hand_cache():
+    return _hand_cache
+
+
+def get_best_hand(hole_cards, community_cards):
+    cards = [*hole_cards, *community_cards]
+
+    if _hand_cache is None:
+        return Hand(evaluate(cards))
+
+    return Hand(_hand_cache.strength(cards))
+
+
+def get_hand(card_set):
+    return Hand(evaluate(card_set))
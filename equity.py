@@ -0,0 +1,284 @@
+from itertools import combinations
+from math import ceil, comb, sqrt
+from multiprocessing import Pool
+from time import perf_counter
+import logging
+import numpy as np
+
+from card import DECK_SIZE, batch_keys, evaluate_batch, evaluate_keys_batch
+from pot import settle_pots
+
+
+_board_size = 5
+
+
+class EquityResult:
+
+    def __init__(self, wins, ties, losses, equity_sum, equity_square_sum, samples, elapsed):
+        self.wins = wins
+        self.ties = ties
+        self.losses = losses
+        self.equity_sum = equity_sum
+        self.equity_square_sum = equity_square_sum
+        self.samples = samples
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return "win {:.4f} tie {:.4f} loss {:.4f} equity {:.4f} (+/- {:.4f}, {} hands, {:.0f} hands/s)".format(
+            self.win(),
+            self.tie(),
+            self.loss(),
+            self.equity(),
+            self.std_error(),
+            self.samples,
+            self.hands_per_second(),
+        )
+
+    def win(self):
+        return self.wins / self.samples
+
+    def tie(self):
+        return self.ties / self.samples
+
+    def loss(self):
+        return self.losses / self.samples
+
+    def equity(self):
+        return self.equity_sum / self.samples
+
+    def std_error(self):
+        if self.samples < 2:
+            return float("inf")
+
+        mean = self.equity()
+        variance = max(self.equity_square_sum / self.samples - mean * mean, 0)
+        return sqrt(variance / (self.samples - 1))
+
+    def hands_per_second(self):
+        if self.elapsed == 0:
+            return float("inf")
+
+        return self.samples / self.elapsed
+
+    def add(self, other):
+        self.wins += other.wins
+        self.ties += other.ties
+        self.losses += other.losses
+        self.equity_sum += other.equity_sum
+        self.equity_square_sum += other.equity_square_sum
+        self.samples += other.samples
+
+
+def _tally(scores):
+    # scores has one row per player with the hero first
+    hero = scores[0]
+    best_opponent = scores[1:].max(axis=0)
+    sharing = (scores[1:] == hero).sum(axis=0) + 1
+
+    won = hero > best_opponent
+    tied = hero == best_opponent
+    equities = np.where(won, 1.0, np.where(tied, 1.0 / sharing, 0.0))
+
+    return EquityResult(
+        int(won.sum()),
+        int(tied.sum()),
+        int(len(hero) - won.sum() - tied.sum()),
+        float(equities.sum()),
+        float((equities * equities).sum()),
+        len(hero),
+        0,
+    )
+
+
+def _sample_batch(hole_cards, opponents, board, remaining, batch_size, seed_sequence):
+    rng = np.random.default_rng(seed_sequence)
+
+    board_needed = _board_size - len(board)
+    random_opponents = sum(1 for opponent in opponents if opponent is None)
+    needed = board_needed + 2 * random_opponents
+
+    drawn = rng.permuted(np.tile(remaining, (batch_size, 1)), axis=1)[:, :needed]
+
+    boards = np.empty((batch_size, _board_size), dtype=np.intp)
+    boards[:, :len(board)] = board
+    boards[:, len(board):] = drawn[:, :board_needed]
+
+    hands = np.empty((1 + len(opponents), batch_size, 2 + _board_size), dtype=np.intp)
+    hands[:, :, 2:] = boards
+    hands[0, :, :2] = hole_cards
+
+    next_drawn = board_needed
+    for index, opponent in enumerate(opponents, 1):
+        if opponent is None:
+            hands[index, :, :2] = drawn[:, next_drawn:next_drawn + 2]
+            next_drawn += 2
+        else:
+            hands[index, :, :2] = opponent
+
+    scores = evaluate_batch(hands.reshape(-1, 2 + _board_size)).reshape(len(hands), batch_size)
+    return _tally(scores)
+
+
+def _sample_batch_star(args):
+    return _sample_batch(*args)
+
+
+def runout_scores(hands, board, runouts):
+    # every board is keyed once and each hand only adds its hole cards
+    fixed_keys, fixed_suit_bits = batch_keys(np.array(board, dtype=np.intp))
+    runout_keys, runout_suit_bits = batch_keys(runouts)
+    board_keys = runout_keys + fixed_keys
+    board_suit_bits = runout_suit_bits + fixed_suit_bits
+
+    scores = np.empty((len(hands), len(runouts)), dtype=np.int64)
+
+    for index, hole_cards in enumerate(hands):
+        hole_keys, hole_suit_bits = batch_keys(np.array(hole_cards, dtype=np.intp))
+        scores[index] = evaluate_keys_batch(board_keys + hole_keys, board_suit_bits + hole_suit_bits)
+
+    return scores
+
+
+def all_in_payouts(contributions, hands, board, remaining, min_denomination, max_runouts=2000, rng=None):
+    # contributions and hands are in deal order with None for every folded
+    # hand; the pots are split by each seat's expected share over every runout
+    # of the remaining cards, or over max_runouts sampled ones if there are more
+    board_needed = _board_size - len(board)
+
+    if comb(len(remaining), board_needed) <= max_runouts:
+        runouts = np.array(list(combinations(remaining, board_needed)), dtype=np.intp)
+        runouts = runouts.reshape(-1, board_needed)
+    else:
+        if rng is None:
+            rng = np.random.default_rng()
+
+        runouts = rng.permuted(np.tile(np.array(remaining, dtype=np.intp), (max_runouts, 1)), axis=1)
+        runouts = runouts[:, :board_needed]
+
+    seats = [seat for seat, hand in enumerate(hands) if hand is not None]
+    scores = runout_scores([hands[seat] for seat in seats], board, runouts)
+
+    # only the order of the hands matters to the pots, so each distinct order
+    # is settled once and weighted by how many runouts produce it
+    ranks = (scores[:, None, :] > scores[None, :, :]).sum(axis=1)
+    orders, counts = np.unique(ranks.T, axis=0, return_counts=True)
+
+    expected = np.zeros(len(contributions))
+    for order, count in zip(orders.tolist(), counts.tolist()):
+        strengths = [None] * len(contributions)
+        for seat, rank in zip(seats, order):
+            strengths[seat] = rank
+
+        expected += count * np.array(settle_pots(contributions, strengths, min_denomination))
+
+    expected /= len(runouts)
+    return _round_to_denomination(expected, sum(contributions), min_denomination)
+
+
+def _round_to_denomination(expected, total, min_denomination):
+    units = expected / min_denomination
+    payouts = np.floor(units).astype(np.int64)
+
+    # the leftover chips go to the largest fractions, earliest in deal order
+    # on ties, and anything below the denomination to the largest share
+    leftover_units = total // min_denomination - int(payouts.sum())
+    by_fraction = np.argsort(payouts - units, kind="stable")
+    payouts[by_fraction[:leftover_units]] += 1
+
+    payouts *= min_denomination
+    payouts[int(np.argmax(expected))] += total % min_denomination
+    return payouts.tolist()
+
+
+class EquityCalculator:
+
+    LOGGER = logging.getLogger(name="EquityCalculator")
+
+    EXACT_BOARD_LIMIT = 100000
+
+    def __init__(self, hole_cards, opponents=1, board=()):
+        if isinstance(opponents, int):
+            opponents = [None] * opponents
+
+        self.hole_cards = tuple(hole_cards)
+        self.opponents = [None if opponent is None else tuple(opponent) for opponent in opponents]
+        self.board = tuple(board)
+
+        known = [*self.hole_cards, *self.board]
+        for opponent in self.opponents:
+            if opponent is not None:
+                known.extend(opponent)
+
+        if len(set(known)) != len(known):
+            raise ValueError("Cards {} are not all distinct".format(known))
+
+        if len(self.board) > _board_size:
+            raise ValueError("Board cannot hold {} cards".format(len(self.board)))
+
+        if not self.opponents:
+            raise ValueError("Equity needs at least one opponent")
+
+        self.remaining = np.array([card for card in range(DECK_SIZE) if card not in known], dtype=np.intp)
+
+        random_opponents = sum(1 for opponent in self.opponents if opponent is None)
+        if _board_size - len(self.board) + 2 * random_opponents > len(self.remaining):
+            raise ValueError("Not enough cards left to deal {} random opponents".format(random_opponents))
+
+    def num_boards(self):
+        return comb(len(self.remaining), _board_size - len(self.board))
+
+    def can_enumerate(self):
+        return None not in self.opponents and self.num_boards() <= self.EXACT_BOARD_LIMIT
+
+    def calculate(self, **monte_carlo_options):
+        if self.can_enumerate():
+            return self.exact()
+
+        return self.monte_carlo(**monte_carlo_options)
+
+    def exact(self):
+        if None in self.opponents:
+            raise ValueError("Exact enumeration needs every opponent's hole cards")
+
+        start = perf_counter()
+
+        board_needed = _board_size - len(self.board)
+        runouts = np.array(list(combinations(self.remaining.tolist(), board_needed)), dtype=np.intp)
+        runouts = runouts.reshape(self.num_boards(), board_needed)
+
+        scores = runout_scores([self.hole_cards, *self.opponents], self.board, runouts)
+        result = _tally(scores)
+        result.elapsed = perf_counter() - start
+        self.LOGGER.info("Exact equity {}".format(result))
+        return result
+
+    def monte_carlo(self, tolerance=0.005, batch_size=10000, min_samples=20000, max_samples=2000000, processes=None, seed=None):
+        max_batches = max(ceil(max_samples / batch_size), 1)
+        seed_sequences = np.random.SeedSequence(seed).spawn(max_batches)
+        batches = (
+            (self.hole_cards, self.opponents, self.board, self.remaining, batch_size, seed_sequence)
+            for seed_sequence in seed_sequences
+        )
+
+        result = EquityResult(0, 0, 0, 0.0, 0.0, 0, 0)
+        start = perf_counter()
+
+        if processes == 1:
+            for batch in batches:
+                result.add(_sample_batch(*batch))
+                if self.converged(result, tolerance, min_samples):
+                    break
+        else:
+            with Pool(processes) as pool:
+                for batch_result in pool.imap_unordered(_sample_batch_star, batches):
+                    result.add(batch_result)
+                    if self.converged(result, tolerance, min_samples):
+                        break
+
+        result.elapsed = perf_counter() - start
+        self.LOGGER.info("Monte Carlo equity {}".format(result))
+        return result
+
+    @staticmethod
+    def converged(result, tolerance, min_samples):
+        return result.samples >= min_samples and result.std_error() <= tolerance
@@ -0,0 +1,67 @@
+import logging
+
+from events import EquityEvent, emit, subscribers
+from player import Player
+from action import *
+from equity import EquityCalculator
+
+
+class EquityPlayer(Player):
+
+    LOGGER = logging.getLogger(name="EquityPlayer")
+
+    def __init__(self, preflop_equity, min_denomination, aggression=1.5, samples=2000):
+        self.preflop_equity = preflop_equity
+        self.min_denomination = min_denomination
+        self.aggression = aggression
+        self.samples = samples
+
+    def supply_state(self, card_1, card_2, bet, game_state):
+        self.card_1 = card_1
+        self.card_2 = card_2
+        self.bet = bet
+        self.game_state = game_state
+
+    def get_action(self):
+        game_state = self.game_state
+        chips = game_state.player_chips[0]
+        opponents = sum(1 for folded in list(game_state.folded)[1:] if not folded)
+        equity = self.equity(opponents)
+
+        call_amount = game_state.current_bet - self.bet
+        pot_odds = call_amount / (game_state.pot + call_amount) if call_amount > 0 else 0
+
+        if subscribers:
+            emit(EquityEvent(self.index, equity, pot_odds))
+
+        if equity < pot_odds:
+            return Fold()
+
+        fair_share = 1 / (opponents + 1)
+        if equity > fair_share * self.aggression and chips >= game_state.current_bet:
+            return Raise(self.raise_amount(chips))
+
+        return CheckCall()
+
+    def equity(self, opponents):
+        if opponents == 0:
+            return 1
+
+        if not self.game_state.cards:
+            return self.preflop_equity.equity(self.card_1, self.card_2, opponents)
+
+        calculator = EquityCalculator((self.card_1, self.card_2), opponents, self.game_state.cards)
+        result = calculator.monte_carlo(
+            batch_size=self.samples,
+            min_samples=self.samples,
+            max_samples=self.samples,
+            processes=1,
+        )
+        return result.equity()
+
+    def raise_amount(self, chips):
+        half_pot = self.game_state.pot // 2 // self.min_denomination * self.min_denomination
+        return min(max(half_pot, self.game_state.current_bet, self.min_denomination), chips)
+
+    def give_reward(self, reward):
+        self.LOGGER.info("Player {} got rewarded {}".format(self.index, reward))
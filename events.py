@@ -0,0 +1,175 @@
+import logging
+
+from action import Fold, CheckCall
+from card import cards_to_string
+
+
+# callbacks given every event; emitting sites check the list before building
+# an event, so with nobody subscribed an event costs a single truthiness test
+subscribers = []
+
+
+def subscribe(callback):
+    subscribers.append(callback)
+
+
+def unsubscribe(callback):
+    subscribers.remove(callback)
+
+
+def emit(event):
+    for callback in subscribers:
+        callback(event)
+
+
+def log_event(event):
+    # the subscriber that reproduces the engine's debug logging
+    event.LOGGER.debug("%s", event)
+
+
+class Event:
+
+    __slots__ = ()
+
+
+class TurnEvent(Event):
+
+    LOGGER = logging.getLogger("Turn")
+
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __str__(self):
+        return "Player {}'s go".format(self.index)
+
+
+class StateEvent(Event):
+
+    LOGGER = logging.getLogger(name="NetworkPlayer")
+
+    __slots__ = ("index", "game_state")
+
+    def __init__(self, index, game_state):
+        self.index = index
+        self.game_state = game_state
+
+    def __str__(self):
+        return "{}, {}".format(self.index, list(self.game_state.player_chips))
+
+
+class ActionEvent(Event):
+
+    LOGGER = logging.getLogger(name="BettingRound")
+
+    __slots__ = ("index", "action", "amount")
+
+    def __init__(self, index, action, amount):
+        # amount is what a call put in, or what a raise added to the bet
+        self.index = index
+        self.action = action
+        self.amount = amount
+
+    def __str__(self):
+        if isinstance(self.action, Fold):
+            return "Player {} folds".format(self.index)
+        elif isinstance(self.action, CheckCall):
+            if self.amount == 0:
+                return "Player {} checks".format(self.index)
+
+            return "Player {} calls, putting in {}".format(self.index, self.amount)
+        else:
+            return "Player {} raises {}".format(self.index, self.amount)
+
+
+class PotMoveEvent(Event):
+
+    LOGGER = logging.getLogger(name="Seat")
+
+    __slots__ = ("index", "amount")
+
+    def __init__(self, index, amount):
+        # amount is positive going into the pot and negative coming out
+        self.index = index
+        self.amount = amount
+
+    def __str__(self):
+        if self.amount < 0:
+            return "Player {} takes {} chips out".format(self.index, -self.amount)
+
+        return "Player {} puts {} chips in".format(self.index, self.amount)
+
+
+class RaiseOutputEvent(Event):
+
+    LOGGER = logging.getLogger(name="NetworkPlayer")
+
+    __slots__ = ("index", "amount", "current_bet", "chips")
+
+    def __init__(self, index, amount, current_bet, chips):
+        # the raise a network asked for, before it is checked
+        self.index = index
+        self.amount = amount
+        self.current_bet = current_bet
+        self.chips = chips
+
+    def __str__(self):
+        return "{} {} {}".format(self.amount, self.current_bet, self.chips)
+
+
+class EquityEvent(Event):
+
+    LOGGER = logging.getLogger(name="EquityPlayer")
+
+    __slots__ = ("index", "equity", "pot_odds")
+
+    def __init__(self, index, equity, pot_odds):
+        self.index = index
+        self.equity = equity
+        self.pot_odds = pot_odds
+
+    def __str__(self):
+        return "Player {} equity {:.3f} against pot odds {:.3f}".format(self.index, self.equity, self.pot_odds)
+
+
+class DealEvent(Event):
+
+    LOGGER = logging.getLogger(name="Round")
+
+    __slots__ = ("street", "cards")
+
+    def __init__(self, street, cards):
+        self.street = street
+        self.cards = tuple(cards)
+
+    def __str__(self):
+        return "{:<5s} {}".format(self.street, cards_to_string(self.cards))
+
+
+class UncontestedEvent(Event):
+
+    LOGGER = logging.getLogger(name="BettingRound")
+
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __str__(self):
+        return "Player {} wins".format(self.index)
+
+
+class ShowdownEvent(Event):
+
+    LOGGER = logging.getLogger(name="Round")
+
+    __slots__ = ("winners", "payouts")
+
+    def __init__(self, winners, payouts):
+        # winners are seat indices, payouts are in deal order
+        self.winners = tuple(winners)
+        self.payouts = tuple(payouts)
+
+    def __str__(self):
+        return "Winning player(s): {}".format(", ".join(str(winner) for winner in self.winners))
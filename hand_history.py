@@ -0,0 +1,316 @@
+import logging
+import os
+import struct
+
+from action import Fold, CheckCall, Raise
+from card import DECK_SIZE, Deck
+from player import Player
+from poker_round import Round
+from seat import Seat
+from table_state import TableState
+
+# every record is length prefixed so the data file can be walked on its own,
+# while the index file holds one (offset, length) entry per hand for seeking
+_length = struct.Struct("<I")
+_index_entry = struct.Struct("<QI")
+_hand_header = struct.Struct("<IIIBBBB")
+_seat_entry = struct.Struct("<BI")
+_action_count = struct.Struct("<H")
+_action_entry = struct.Struct("<BBI")
+_payout_entry = struct.Struct("<I")
+_ACTIONS = (Fold, CheckCall, Raise)
+
+
+def hand_history_path(history_dir, seed_sequence):
+    # a table's seed names its file, so every table writes to its own
+    name = "-".join(str(key) for key in (seed_sequence.entropy, *seed_sequence.spawn_key))
+    return os.path.join(history_dir, "hands-{}.bin".format(name))
+
+
+def encode_action(index, action):
+    amount = action.amount if isinstance(action, Raise) else 0
+    return index, action.index(), amount
+
+
+def decode_action(kind, amount):
+    if kind == Raise.index():
+        return Raise(amount)
+
+    return _ACTIONS[kind]()
+
+
+class HandRecord:
+
+    def __init__(self, entropy, spawn_key, hand_number, small_blind, min_denomination, all_in_equity, seats, chips, deck):
+        self.entropy = entropy
+        self.spawn_key = tuple(spawn_key)
+        self.hand_number = hand_number
+        self.small_blind = small_blind
+        self.min_denomination = min_denomination
+        self.all_in_equity = bool(all_in_equity)
+
+        # seat indices and starting chips in deal order, and the deck in the
+        # order it is dealt from (the last card comes off first)
+        self.seats = list(seats)
+        self.chips = list(chips)
+        self.deck = bytes(deck)
+
+        # (seat index, action kind, raise amount) for every decision made
+        self.actions = []
+        self.payouts = []
+
+    @classmethod
+    def start(cls, table, poker_round, hand_number):
+        seed_sequence = table.seed_sequence
+        seats = poker_round.seats
+        return cls(
+            seed_sequence.entropy,
+            seed_sequence.spawn_key,
+            hand_number,
+            poker_round.small_blind,
+            poker_round.min_denomination,
+            poker_round.all_in_equity,
+            [seat.index for seat in seats],
+            [seat.chips for seat in seats],
+            poker_round.deck.cards,
+        )
+
+    def add_action(self, index, action):
+        self.actions.append(encode_action(index, action))
+
+    def get_actions(self):
+        return [(index, decode_action(kind, amount)) for index, kind, amount in self.actions]
+
+    def to_bytes(self):
+        entropy = self.entropy.to_bytes((self.entropy.bit_length() + 7) // 8, "little")
+        parts = [
+            _hand_header.pack(
+                self.hand_number,
+                self.small_blind,
+                self.min_denomination,
+                self.all_in_equity,
+                len(entropy),
+                len(self.spawn_key),
+                len(self.seats),
+            ),
+            entropy,
+            struct.pack("<{}I".format(len(self.spawn_key)), *self.spawn_key),
+        ]
+
+        for index, chips in zip(self.seats, self.chips):
+            parts.append(_seat_entry.pack(index, chips))
+
+        parts.append(self.deck)
+        parts.append(_action_count.pack(len(self.actions)))
+
+        for action in self.actions:
+            parts.append(_action_entry.pack(*action))
+
+        for payout in self.payouts:
+            parts.append(_payout_entry.pack(payout))
+
+        body = b"".join(parts)
+        return _length.pack(len(body)) + body
+
+    @classmethod
+    def from_bytes(cls, data):
+        offset = _length.size
+        hand_number, small_blind, min_denomination, all_in_equity, entropy_size, spawn_key_size, num_seats = \
+            _hand_header.unpack_from(data, offset)
+        offset += _hand_header.size
+
+        entropy = int.from_bytes(data[offset:offset + entropy_size], "little")
+        offset += entropy_size
+
+        spawn_key = struct.unpack_from("<{}I".format(spawn_key_size), data, offset)
+        offset += 4 * spawn_key_size
+
+        seats = []
+        chips = []
+        for _ in range(num_seats):
+            index, seat_chips = _seat_entry.unpack_from(data, offset)
+            seats.append(index)
+            chips.append(seat_chips)
+            offset += _seat_entry.size
+
+        deck = data[offset:offset + DECK_SIZE]
+        offset += DECK_SIZE
+
+        record = cls(
+            entropy,
+            spawn_key,
+            hand_number,
+            small_blind,
+            min_denomination,
+            all_in_equity,
+            seats,
+            chips,
+            deck
+        )
+
+        num_actions, = _action_count.unpack_from(data, offset)
+        offset += _action_count.size
+        record.actions = list(_action_entry.iter_unpack(data[offset:offset + num_actions * _action_entry.size]))
+        offset += num_actions * _action_entry.size
+
+        record.payouts = [payout for payout, in _payout_entry.iter_unpack(data[offset:offset + 4 * num_seats])]
+
+        return record
+
+
+def record_steps(steps, record):
+    # passes a round's steps through unchanged, noting every action sent back
+    try:
+        seat = next(steps)
+        while True:
+            action = yield seat
+            record.add_action(seat.index, action)
+            seat = steps.send(action)
+    except StopIteration as stop:
+        return stop.value
+
+
+class HandHistoryWriter:
+
+    LOGGER = logging.getLogger(name="HandHistoryWriter")
+
+    def __init__(self, path):
+        self.path = path
+        self.data_file = open(path, "ab")
+        self.index_file = open(path + ".idx", "ab")
+        self.offset = self.data_file.tell()
+        self.hands_written = 0
+
+    def write(self, record):
+        data = record.to_bytes()
+        self.data_file.write(data)
+        self.index_file.write(_index_entry.pack(self.offset, len(data)))
+        self.offset += len(data)
+        self.hands_written += 1
+
+    def close(self):
+        self.data_file.close()
+        self.index_file.close()
+        self.LOGGER.debug("Wrote {} hands to {}".format(self.hands_written, self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+class HandHistoryReader:
+
+    def __init__(self, path):
+        self.path = path
+        self.data_file = open(path, "rb")
+
+        index_path = path + ".idx"
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as index_file:
+                self.index = list(_index_entry.iter_unpack(index_file.read()))
+        else:
+            self.index = self.scan()
+
+    def scan(self):
+        # rebuilds the index by hopping from one length prefix to the next
+        index = []
+        data_size = os.path.getsize(self.path)
+        offset = 0
+
+        while offset + _length.size <= data_size:
+            self.data_file.seek(offset)
+            length, = _length.unpack(self.data_file.read(_length.size))
+            index.append((offset, _length.size + length))
+            offset += _length.size + length
+
+        return index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, hand):
+        offset, length = self.index[hand]
+        self.data_file.seek(offset)
+        return HandRecord.from_bytes(self.data_file.read(length))
+
+    def __iter__(self):
+        for hand in range(len(self)):
+            yield self[hand]
+
+    def close(self):
+        self.data_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+class ReplayPlayer(Player):
+
+    def supply_state(self, card_1, card_2, bet, game_state):
+        pass
+
+    def give_reward(self, reward):
+        pass
+
+
+def replay_hand(record, num_actions=None):
+    # rebuilds the hand from its deal and recorded actions without asking any
+    # player; stopping after num_actions leaves the round mid-hand
+    state = TableState(max(record.seats) + 1)
+    seats = [Seat(ReplayPlayer(), index, chips, state) for index, chips in zip(record.seats, record.chips)]
+    poker_round = Round(
+        seats,
+        record.small_blind,
+        record.min_denomination,
+        Deck(list(record.deck)),
+        record.all_in_equity
+    )
+
+    actions = record.get_actions()
+    if num_actions is not None:
+        actions = actions[:num_actions]
+
+    steps = poker_round.steps()
+    sent = 0
+
+    try:
+        seat = next(steps)
+        for index, action in actions:
+            if seat.index != index:
+                raise ValueError("Hand {} expected seat {} to act but seat {} did".format(
+                    record.hand_number,
+                    index,
+                    seat.index
+                ))
+
+            sent += 1
+            seat = steps.send(action)
+    except StopIteration:
+        if sent < len(actions):
+            raise ValueError("Hand {} finished after {} of {} actions".format(
+                record.hand_number,
+                sent,
+                len(actions)
+            ))
+
+        if poker_round.payouts != record.payouts:
+            raise ValueError("Hand {} paid out {} but recorded {}".format(
+                record.hand_number,
+                poker_round.payouts,
+                record.payouts
+            ))
+
+        return poker_round
+
+    if num_actions is None:
+        raise ValueError("Hand {} needs more than its {} recorded actions".format(
+            record.hand_number,
+            len(actions)
+        ))
+
+    return poker_round
@@ -1,6 +1,7 @@
 import click
 import re
 
+from card import card_to_string, cards_to_string
 from player import Player
 from action import *
 
@@ -17,8 +18,8 @@ class HumanPlayer(Player):
 
     def get_action(self):
         print("Player number  : {}".format(self.index))
-        print("Hole cards     : {} {}".format(self.card_1, self.card_2))
-        print("Table cards    : {}".format(" ".join(str(card) for card in self.game_state.cards)))
+        print("Hole cards     : {} {}".format(card_to_string(self.card_1), card_to_string(self.card_2)))
+        print("Table cards    : {}".format(cards_to_string(self.game_state.cards)))
         print("Your bet       : {}".format(self.player_bet))
         print("Current bet    : {}".format(self.game_state.current_bet))
         print("Pot            : {}".format(self.game_state.pot))
@@ -0,0 +1,59 @@
+import logging
+
+
+class PlayerBackend:
+
+    # the fallback backend asks every seat's own player, one at a time;
+    # batch-capable backends override get_actions to answer them all at once
+    def get_actions(self, seats):
+        return [seat.get_action() for seat in seats]
+
+
+class LockstepSimulator:
+
+    LOGGER = logging.getLogger(name="LockstepSimulator")
+
+    def __init__(self, tables, backend=None):
+        if backend is None:
+            backend = PlayerBackend()
+
+        self.tables = tables
+        self.backend = backend
+        self.decisions = 0
+        self.batches = 0
+
+    def run(self):
+        waiting = []
+
+        for table in self.tables:
+            steps = table.steps()
+            self.advance(steps, None, waiting)
+
+        while waiting:
+            seats = [seat for _, seat in waiting]
+            actions = self.backend.get_actions(seats)
+
+            self.decisions += len(seats)
+            self.batches += 1
+
+            next_waiting = []
+            for (steps, _), action in zip(waiting, actions):
+                self.advance(steps, action, next_waiting)
+
+            waiting = next_waiting
+
+        self.LOGGER.info("{} tables finished after {} decisions in {} batches".format(
+            len(self.tables),
+            self.decisions,
+            self.batches
+        ))
+
+    @staticmethod
+    def advance(steps, action, waiting):
+        # sending None starts a fresh generator, just like next()
+        try:
+            seat = steps.send(action)
+        except StopIteration:
+            return
+
+        waiting.append((steps, seat))
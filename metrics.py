@@ -0,0 +1,97 @@
+from time import perf_counter
+import json
+
+
+class Timer:
+
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exception):
+        self.metrics.add_time(self.name, perf_counter() - self.start)
+
+
+class Metrics:
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.timers = dict()
+        self.counters = dict()
+        self.tables = []
+
+    def timer(self, name):
+        return Timer(self, name)
+
+    def add_time(self, name, seconds):
+        self.timers[name] = self.timers.get(name, 0) + seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_table(self, hands, decisions, seconds):
+        self.count("hands", hands)
+        self.count("decisions", decisions)
+        self.tables.append({"hands": hands, "decisions": decisions, "seconds": seconds})
+
+    def to_dict(self):
+        return {"timers": self.timers, "counters": self.counters, "tables": self.tables}
+
+    def merge(self, other):
+        # other is another process's to_dict, so it can cross a pipe
+        for name, seconds in other["timers"].items():
+            self.add_time(name, seconds)
+
+        for name, amount in other["counters"].items():
+            self.count(name, amount)
+
+        self.tables.extend(other["tables"])
+
+    def summary(self, seconds, **fields):
+        hands = self.counters.get("hands", 0)
+        decisions = self.counters.get("decisions", 0)
+        table_seconds = sum(table["seconds"] for table in self.tables)
+
+        summary = dict(fields)
+        summary.update({
+            "seconds": seconds,
+            "hands": hands,
+            "decisions": decisions,
+            "hands_per_second": hands / seconds if seconds else 0,
+            "decisions_per_second": decisions / seconds if seconds else 0,
+            "table_seconds": table_seconds,
+            "timers": self.timers,
+            "counters": self.counters,
+            "tables": self.tables,
+        })
+
+        return summary
+
+    def write(self, path, seconds, **fields):
+        with open(path, "a") as metrics_file:
+            metrics_file.write(json.dumps(self.summary(seconds, **fields)) + "\n")
+
+
+_metrics = None
+
+
+def configure_metrics(enabled):
+    global _metrics
+
+    if enabled:
+        _metrics = Metrics()
+    else:
+        _metrics = None
+
+    return _metrics
+
+
+def get_metrics():
+    return _metrics
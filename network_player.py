@@ -1,31 +1,114 @@
-from itertools import chain
+from collections import OrderedDict
 from numpy import argmax
 import _MultiNEAT as NEAT
 import logging
+import numpy as np
 
+from card import DECK_SIZE, card_number, card_suit
+from events import RaiseOutputEvent, StateEvent, emit, subscribers
+from lockstep import PlayerBackend
+from metrics import get_metrics
+from phenotype import StackedNetworks, get_compiled
 from player import Player
 from action import *
 
 
-_table_cards_length = 85
+_card_vector_length = 4 + 13
+_table_cards_length = 5 * _card_vector_length
+_action_indicator_length = 3
 
 
-def _concatenate(iterable, function):
-    return list(chain.from_iterable(function(item) for item in iterable))
+def _card_rows():
+    rows = np.zeros((DECK_SIZE, _card_vector_length))
+    for card in range(DECK_SIZE):
+        rows[card, card_suit(card)] = 1
+        rows[card, 4 + card_number(card)] = 1
 
+    return rows
 
-def _zero_pad_to_length(vector, length):
-    return vector + [0] * (length - len(vector))
+
+# a card's suit one-hot followed by its number one-hot
+_CARD_ROWS = _card_rows()
+
+# a byte's bits from the most significant down
+_BYTE_BITS = ((np.arange(256)[:, None] >> np.arange(7, -1, -1)) & 1).astype(np.float64)
+
+
+def _money_bits(amount, size):
+    # amount's bits from the most significant down, padded with zeros on the
+    # right up to size, built a byte at a time
+    num_bytes = (size + 7) // 8
+    aligned = amount << (num_bytes * 8 - amount.bit_length())
+    return _BYTE_BITS[list(aligned.to_bytes(num_bytes, "big"))].ravel()[:size]
+
+
+def _activation_depth(network):
+    # the most activations a signal needs to travel from the inputs to the
+    # outputs: the longest path once the links closing a cycle, the back
+    # edges of a depth first search, are left out. Every neuron that isn't
+    # an input is computed, so it starts a level in.
+    neurons = network.neurons
+    input_types = (NEAT.NeuronType.INPUT, NEAT.NeuronType.BIAS)
+    outgoing = [[] for _ in neurons]
+    for connection in network.connections:
+        outgoing[connection.source_neuron_idx].append(connection.target_neuron_idx)
+
+    # 0 unseen, 1 on the search path, 2 finished; neurons finish in reverse
+    # topological order of the links that are kept
+    states = [0] * len(neurons)
+    kept = [[] for _ in neurons]
+    finished = []
+
+    for root in range(len(neurons)):
+        if states[root]:
+            continue
+
+        states[root] = 1
+        path = [(root, iter(outgoing[root]))]
+        while path:
+            source, targets = path[-1]
+            for target in targets:
+                if states[target] == 1:
+                    continue
+
+                kept[source].append(target)
+                if states[target] == 0:
+                    states[target] = 1
+                    path.append((target, iter(outgoing[target])))
+                    break
+            else:
+                states[source] = 2
+                finished.append(source)
+                path.pop()
+
+    levels = [0 if neuron.type in input_types else 1 for neuron in neurons]
+    for source in reversed(finished):
+        for target in kept[source]:
+            levels[target] = max(levels[target], levels[source] + 1)
+
+    return max(1, max(levels, default=0))
 
 
 class NetworkPlayer(Player):
 
     LOGGER = logging.getLogger(name="NetworkPlayer")
 
-    def __init__(self, genome, money_vector_size, table_size, min_denomination, genome_index=None):
+    def __init__(self, genome, money_vector_size, table_size, min_denomination, genome_index=None, observe_all_turns=False):
         self.genome = genome
-        self.network = NEAT.NeuralNetwork()
-        self.genome.BuildPhenotype(self.network)
+
+        # by default the state is only recorded as it arrives and the network
+        # is run to depth when it has to act; stateful networks can instead
+        # be activated once for every turn at the table, as they were evolved
+        self.observes_all_turns = observe_all_turns
+
+        # feed-forward networks run compiled and can share it through the
+        # phenotype cache; the rest get their own MultiNEAT network
+        self.compiled_network = None if observe_all_turns else get_compiled(genome)
+        self.network = None
+        if self.compiled_network is None:
+            self.network = NEAT.NeuralNetwork()
+            self.genome.BuildPhenotype(self.network)
+            self.activation_depth = _activation_depth(self.network)
 
         self.money_vector_size = money_vector_size
         self.table_size = table_size
@@ -33,32 +116,98 @@ class NetworkPlayer(Player):
         self.disqualified = False
         self.genome_index = genome_index
 
+        self.max_money = (1 << money_vector_size) - 1
+        self.create_input_layout()
+
+    def create_input_layout(self):
+        # the input is one preallocated array; each part of the state has a
+        # fixed slice and remembers what it last wrote there
+        money = self.money_vector_size
+        table_size = self.table_size
+        offset = 0
+
+        self.card_offsets = (offset, offset + _card_vector_length)
+        offset += 2 * _card_vector_length
+        self.bet_offset = offset
+        offset += money
+        self.table_cards_offset = offset
+        offset += _table_cards_length
+        self.pot_offset = offset
+        offset += money
+        self.current_bet_offset = offset
+        offset += money
+        self.player_chips_offset = offset
+        offset += table_size * money
+        self.turn_indicator_offset = offset
+        offset += table_size
+        self.folded_offset = offset
+        offset += table_size
+        self.action_offset = offset
+        offset += _action_indicator_length + money
+
+        self.inputs = np.zeros(offset)
+        self.written = dict()
+        self.table_cards = None
+        self.num_table_cards = 0
+        self.player_chips = [0] * table_size
+        self.turn_indicator = [0] * table_size
+        self.folded = [0] * table_size
+
     def supply_state(self, card_1, card_2, bet, game_state):
         self.current_bet = game_state.current_bet
-        self.LOGGER.debug("{}, {}".format(self.index, list(game_state.player_chips)))
-        self.chips = game_state.player_chips[0]
-
-        input_vector = (
-            self.card_to_vector(card_1) +
-            self.card_to_vector(card_2) +
-            self.money_to_vector(bet) +
-            self.table_cards_to_vector(game_state.cards) +
-            self.money_to_vector(game_state.pot) +
-            self.money_to_vector(game_state.current_bet) +
-            self.player_chips_to_vector(game_state.player_chips) +
-            self.indicator_to_vector(game_state.turn_indicator) +
-            self.indicator_to_vector(game_state.folded) +
-            self.action_to_vector(game_state.last_action)
-        )
-
-        self.network.Input(input_vector)
-        self.network.Activate()
+        if subscribers:
+            emit(StateEvent(self.index, game_state))
+
+        player_chips = game_state.player_chips
+        self.chips = player_chips[0]
+
+        self.write_card(self.card_offsets[0], card_1)
+        self.write_card(self.card_offsets[1], card_2)
+        self.write_money(self.bet_offset, bet)
+        self.write_table_cards(game_state.cards)
+        self.write_money(self.pot_offset, game_state.pot)
+        self.write_money(self.current_bet_offset, game_state.current_bet)
+        self.write_player_chips(player_chips)
+        self.write_indicator(self.turn_indicator_offset, self.turn_indicator, game_state.turn_indicator)
+        self.write_indicator(self.folded_offset, self.folded, game_state.folded)
+        self.write_action(game_state.last_action)
+
+        if self.observes_all_turns:
+            self.activate(1)
+
+    def activate(self, times):
+        self.network.Input(self.inputs.tolist())
+
+        metrics = get_metrics()
+        if metrics is None:
+            for _ in range(times):
+                self.network.Activate()
+        else:
+            with metrics.timer("activate"):
+                for _ in range(times):
+                    self.network.Activate()
 
     def get_action(self):
         if self.disqualified:
             return Fold()
 
-        output_vector = self.network.Output()
+        if self.compiled_network is not None:
+            return self.choose_action(self.activate_compiled())
+
+        if not self.observes_all_turns:
+            self.activate(self.activation_depth)
+
+        return self.choose_action(self.network.Output())
+
+    def activate_compiled(self):
+        metrics = get_metrics()
+        if metrics is None:
+            return self.compiled_network.activate(self.inputs)[0]
+
+        with metrics.timer("activate"):
+            return self.compiled_network.activate(self.inputs)[0]
+
+    def choose_action(self, output_vector):
         action_index = argmax(output_vector[:3])
 
         if action_index == Fold.index():
@@ -68,49 +217,90 @@ class NetworkPlayer(Player):
         else:
             return self.deal_with_raise(output_vector)
 
+    def reset(self):
+        self.disqualified = False
+        if self.network is not None:
+            self.network.Flush()
+
     def give_reward(self, reward):
         fitness = self.genome.GetFitness()
         self.LOGGER.info("Player {} got rewarded {}".format(self.index, reward))
         self.genome.SetFitness(fitness + reward)
 
-    def card_to_vector(self, card):
-        suit = [0] * 4
-        suit[card.suit.int_value] = 1
-
-        number = [0] * 13
-        number[card.number.int_value] = 1
-
-        return suit + number
-
-    def table_cards_to_vector(self, table_cards):
-        table_card_vector = _concatenate(table_cards, self.card_to_vector)
-        return _zero_pad_to_length(table_card_vector, _table_cards_length)
-
-    def money_to_vector(self, amount):
-        amount //= self.min_denomination
-        binary_list = [int(bit) for bit in bin(amount)[2:]]
-        return binary_list + [0] * (self.money_vector_size - len(binary_list))
-
-    def player_chips_to_vector(self, table_chips):
-        player_chips_vector = _concatenate(table_chips, self.money_to_vector)
-        pad_length = self.table_size * self.money_vector_size
-        return _zero_pad_to_length(player_chips_vector, pad_length)
-
-    def indicator_to_vector(self, indicator):
-        return _zero_pad_to_length(list(indicator), self.table_size)
-
-    def action_to_vector(self, action):
-        action_indicator = [0] * 3
-        if action:
-            action_indicator[action.index()] = 1
-
-        if isinstance(action, Raise):
-            money = action.amount
-        else:
-            money = 0
-
-        money_vector = self.money_to_vector(money)
-        return action_indicator + money_vector
+    def write_card(self, offset, card):
+        if self.written.get(offset) != card:
+            self.inputs[offset:offset + _card_vector_length] = _CARD_ROWS[card]
+            self.written[offset] = card
+
+    def write_money(self, offset, amount):
+        # amounts too big for the vector saturate at every bit set
+        amount = min(amount // self.min_denomination, self.max_money)
+        if self.written.get(offset) != amount:
+            self.inputs[offset:offset + self.money_vector_size] = _money_bits(amount, self.money_vector_size)
+            self.written[offset] = amount
+
+    def write_table_cards(self, table_cards):
+        # the board only grows during a hand, so only new cards are written
+        if table_cards is not self.table_cards:
+            start = self.table_cards_offset
+            self.inputs[start:start + self.num_table_cards * _card_vector_length] = 0
+            self.table_cards = table_cards
+            self.num_table_cards = 0
+
+        for card in table_cards[self.num_table_cards:]:
+            start = self.table_cards_offset + self.num_table_cards * _card_vector_length
+            self.inputs[start:start + _card_vector_length] = _CARD_ROWS[card]
+            self.num_table_cards += 1
+
+    def write_player_chips(self, player_chips):
+        money = self.money_vector_size
+        max_chips = self.max_money
+        written = self.player_chips
+        num_written = 0
+
+        for offset, chips in zip(range(self.table_size), player_chips):
+            chips = min(chips // self.min_denomination, max_chips)
+            if written[offset] != chips:
+                start = self.player_chips_offset + offset * money
+                self.inputs[start:start + money] = _money_bits(chips, money)
+                written[offset] = chips
+
+            num_written += 1
+
+        # seats no longer dealt in are cleared
+        for offset in range(num_written, self.table_size):
+            if written[offset] != 0:
+                start = self.player_chips_offset + offset * money
+                self.inputs[start:start + money] = 0
+                written[offset] = 0
+
+    def write_indicator(self, start, written, indicator):
+        num_written = 0
+
+        for offset, value in zip(range(self.table_size), indicator):
+            if written[offset] != value:
+                self.inputs[start + offset] = value
+                written[offset] = value
+
+            num_written += 1
+
+        for offset in range(num_written, self.table_size):
+            if written[offset] != 0:
+                self.inputs[start + offset] = 0
+                written[offset] = 0
+
+    def write_action(self, action):
+        index = action.index() if action else None
+        if self.written.get(self.action_offset) != index:
+            start = self.action_offset
+            self.inputs[start:start + _action_indicator_length] = 0
+            if action:
+                self.inputs[start + index] = 1
+
+            self.written[self.action_offset] = index
+
+        money = action.amount if isinstance(action, Raise) else 0
+        self.write_money(self.action_offset + _action_indicator_length, money)
 
     def vector_to_money(self, vector):
         money = 0
@@ -122,7 +312,8 @@ class NetworkPlayer(Player):
 
     def deal_with_raise(self, output_vector):
         amount = self.vector_to_money(output_vector[3:])
-        self.LOGGER.debug("{} {} {}".format(amount, self.current_bet, self.chips))
+        if subscribers:
+            emit(RaiseOutputEvent(self.index, amount, self.current_bet, self.chips))
 
         if self.chips == 0:
             self.LOGGER.info(
@@ -161,3 +352,67 @@ class NetworkPlayer(Player):
             return Fold()
 
         return Raise(amount)
+
+
+class NetworkBackend(PlayerBackend):
+
+    # answers every compiled network player waiting in a lockstep batch with
+    # one stacked evaluation per network layout; anyone else is asked directly
+    def __init__(self, max_stacks=256):
+        # the same players tend to wait together again, so their stacked
+        # weights are kept rather than rebuilt for every batch
+        self.max_stacks = max_stacks
+        self.stacks = OrderedDict()
+
+    def stacked(self, networks):
+        # the stack holds its networks, so their ids can't be reused while
+        # it is cached
+        key = tuple(id(network) for network in networks)
+
+        try:
+            stack = self.stacks[key]
+        except KeyError:
+            stack = StackedNetworks(networks)
+            self.stacks[key] = stack
+
+            if len(self.stacks) > self.max_stacks:
+                self.stacks.popitem(last=False)
+
+            return stack
+
+        self.stacks.move_to_end(key)
+        return stack
+
+    def activate(self, networks, inputs):
+        if len(networks) == 1:
+            return networks[0].activate(inputs)
+
+        return self.stacked(networks).activate(inputs)
+
+    def get_actions(self, seats):
+        actions = [None] * len(seats)
+        layouts = dict()
+
+        for position, seat in enumerate(seats):
+            player = seat.player
+            if isinstance(player, NetworkPlayer) and player.compiled_network is not None and not player.disqualified:
+                layouts.setdefault(player.compiled_network.layout, []).append(position)
+            else:
+                actions[position] = seat.get_action()
+
+        metrics = get_metrics()
+        for positions in layouts.values():
+            players = [seats[position].player for position in positions]
+            networks = [player.compiled_network for player in players]
+            inputs = np.stack([player.inputs for player in players])
+
+            if metrics is None:
+                outputs = self.activate(networks, inputs)
+            else:
+                with metrics.timer("activate"):
+                    outputs = self.activate(networks, inputs)
+
+            for position, player, output_vector in zip(positions, players, outputs):
+                actions[position] = player.choose_action(output_vector)
+
+        return actions
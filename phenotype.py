@@ -0,0 +1,297 @@
+from collections import OrderedDict
+import _MultiNEAT as NEAT
+import numpy as np
+
+
+def _unsigned_sigmoid(x, slope, shift):
+    return 1.0 / (1.0 + np.exp(-slope * x - shift))
+
+
+def _signed_sigmoid(x, slope, shift):
+    return (_unsigned_sigmoid(x, slope, shift) - 0.5) * 2.0
+
+
+def _tanh(x, slope, shift):
+    return np.tanh(x * slope)
+
+
+def _linear(x, slope, shift):
+    return x * slope + shift
+
+
+def _relu(x, slope, shift):
+    return np.maximum(x, 0.0)
+
+
+# the activation functions MultiNEAT applies in Activate, by their enum name
+_ACTIVATIONS = {
+    "UNSIGNED_SIGMOID": _unsigned_sigmoid,
+    "SIGNED_SIGMOID": _signed_sigmoid,
+    "TANH": _tanh,
+    "LINEAR": _linear,
+    "RELU": _relu,
+}
+
+
+class Layer:
+
+    def __init__(self, targets, weights, kinds, slopes, shifts):
+        # weights has a row per target over every neuron, so a layer is one
+        # product with the activations of all the layers before it
+        self.targets = targets
+        self.weights = weights
+        self.kinds = kinds
+        self.slopes = slopes
+        self.shifts = shifts
+        self.functions = [(kind, _ACTIVATIONS[kind]) for kind in sorted(set(kinds.tolist()))]
+
+    def layout(self):
+        return tuple(self.targets.tolist()), tuple(self.kinds.tolist())
+
+    def apply(self, sums, slopes, shifts):
+        if len(self.functions) == 1:
+            _, function = self.functions[0]
+            return function(sums, slopes, shifts)
+
+        outputs = np.empty_like(sums)
+        for kind, function in self.functions:
+            columns = self.kinds == kind
+            outputs[..., columns] = function(sums[..., columns], slopes[..., columns], shifts[..., columns])
+
+        return outputs
+
+
+class CompiledNetwork:
+
+    def __init__(self, num_neurons, inputs, outputs, layers):
+        self.num_neurons = num_neurons
+        self.inputs = inputs
+        self.outputs = outputs
+        self.layers = layers
+
+        # networks with the same layout differ only in their weights and
+        # activation parameters, so they can be evaluated stacked
+        self.layout = (
+            num_neurons,
+            tuple(inputs.tolist()),
+            tuple(outputs.tolist()),
+            tuple(layer.layout() for layer in layers),
+        )
+
+    def activate(self, inputs):
+        # one row of inputs per evaluation, returning a row of outputs each
+        inputs = np.atleast_2d(inputs)
+        neurons = np.zeros((len(inputs), self.num_neurons))
+        neurons[:, self.inputs] = inputs[:, :len(self.inputs)]
+
+        for layer in self.layers:
+            sums = neurons @ layer.weights.T
+            neurons[:, layer.targets] = layer.apply(sums, layer.slopes, layer.shifts)
+
+        return neurons[:, self.outputs]
+
+
+class StackedNetworks:
+
+    def __init__(self, networks):
+        # networks share a layout; their weights and activation parameters
+        # are stacked once here, so each evaluation is one einsum per layer
+        first = networks[0]
+        self.networks = networks
+        self.num_neurons = first.num_neurons
+        self.inputs = first.inputs
+        self.outputs = first.outputs
+        self.layers = []
+
+        for index, layer in enumerate(first.layers):
+            stacked = [network.layers[index] for network in networks]
+            self.layers.append((
+                layer,
+                np.stack([other.weights for other in stacked]),
+                np.stack([other.slopes for other in stacked]),
+                np.stack([other.shifts for other in stacked]),
+            ))
+
+    def activate(self, inputs):
+        # one row of inputs per network, in the order they were stacked
+        neurons = np.zeros((len(self.networks), self.num_neurons))
+        neurons[:, self.inputs] = inputs[:, :len(self.inputs)]
+
+        for layer, weights, slopes, shifts in self.layers:
+            sums = np.einsum("gn,gtn->gt", neurons, weights)
+            neurons[:, layer.targets] = layer.apply(sums, slopes, shifts)
+
+        return neurons[:, self.outputs]
+
+
+def compile_phenotype(network):
+    # MultiNEAT's Activate moves every signal one connection per call; on an
+    # acyclic network, running it once per layer is the same as evaluating
+    # the neurons layer by layer in topological order, which is what this
+    # compiles to. Recurrent networks have no such order and are refused.
+    neurons = network.neurons
+    num_neurons = len(neurons)
+    input_types = (NEAT.NeuronType.INPUT, NEAT.NeuronType.BIAS)
+
+    inputs = [index for index, neuron in enumerate(neurons) if neuron.type in input_types]
+    outputs = [index for index, neuron in enumerate(neurons) if neuron.type == NEAT.NeuronType.OUTPUT]
+
+    incoming = [[] for _ in range(num_neurons)]
+    outgoing = [[] for _ in range(num_neurons)]
+    for connection in network.connections:
+        source = connection.source_neuron_idx
+        target = connection.target_neuron_idx
+        incoming[target].append((source, connection.weight))
+        outgoing[source].append(target)
+
+    # longest path from the inputs by Kahn's algorithm; every neuron that is
+    # not an input is computed, even with no connections in
+    input_set = set(inputs)
+    levels = [0 if index in input_set else 1 for index in range(num_neurons)]
+    waiting = [len(sources) for sources in incoming]
+    ready = [index for index in range(num_neurons) if waiting[index] == 0]
+    num_sorted = 0
+
+    while ready:
+        source = ready.pop()
+        num_sorted += 1
+
+        for target in outgoing[source]:
+            levels[target] = max(levels[target], levels[source] + 1)
+            waiting[target] -= 1
+            if waiting[target] == 0:
+                ready.append(target)
+
+    if num_sorted < num_neurons:
+        raise ValueError("Recurrent networks have no layered form")
+
+    layers = []
+    for level in range(1, max(levels, default=0) + 1):
+        targets = [index for index in range(num_neurons) if levels[index] == level]
+        if not targets:
+            continue
+
+        weights = np.zeros((len(targets), num_neurons))
+        for row, target in enumerate(targets):
+            for source, weight in incoming[target]:
+                weights[row, source] += weight
+
+        kinds = [neurons[target].activation_function_type.name for target in targets]
+        unsupported = set(kinds) - set(_ACTIVATIONS)
+        if unsupported:
+            raise ValueError("Cannot compile activation functions {}".format(sorted(unsupported)))
+
+        layers.append(Layer(
+            np.array(targets, dtype=np.intp),
+            weights,
+            np.array(kinds),
+            np.array([neurons[target].a for target in targets]),
+            np.array([neurons[target].b for target in targets]),
+        ))
+
+    return CompiledNetwork(
+        num_neurons,
+        np.array(inputs, dtype=np.intp),
+        np.array(outputs, dtype=np.intp),
+        layers,
+    )
+
+
+def genome_key(genome):
+    # everything BuildPhenotype reads from a genome: its neurons in order and
+    # its links, so equal keys mean interchangeable phenotypes
+    neurons = tuple(
+        (gene.ID(), int(gene.Type), int(gene.ActFunction), gene.A, gene.B)
+        for gene in genome.NeuronGenes
+    )
+    links = tuple(
+        (gene.FromNeuronID(), gene.ToNeuronID(), gene.GetWeight())
+        for gene in genome.LinkGenes
+    )
+
+    return neurons, links
+
+
+def build_compiled(genome):
+    network = NEAT.NeuralNetwork()
+    genome.BuildPhenotype(network)
+
+    try:
+        return compile_phenotype(network)
+    except ValueError:
+        return None
+
+
+class PhenotypeCache:
+
+    # compiled networks hold no state between decisions, so one can be
+    # shared by every player of an unchanged genome; genomes that don't
+    # compile are remembered as None so they aren't compiled again
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.reset_stats()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0,
+        }
+
+    def compiled(self, genome):
+        key = genome_key(genome)
+
+        try:
+            compiled_network = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            compiled_network = build_compiled(genome)
+            self.entries[key] = compiled_network
+
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+            return compiled_network
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return compiled_network
+
+
+_phenotype_cache = None
+
+
+def configure_phenotype_cache(max_size):
+    global _phenotype_cache
+
+    if max_size:
+        _phenotype_cache = PhenotypeCache(max_size)
+    else:
+        _phenotype_cache = None
+
+    return _phenotype_cache
+
+
+def get_phenotype_cache():
+    return _phenotype_cache
+
+
+def get_compiled(genome):
+    if _phenotype_cache is None:
+        return build_compiled(genome)
+
+    return _phenotype_cache.compiled(genome)
@@ -1,5 +1,9 @@
 class Player:
 
+    # players that keep state between decisions can ask to be supplied the
+    # game state on every turn rather than only on their own
+    observes_all_turns = False
+
     def supply_state(self, card_1, card_2, bet, game_state):
         raise NotImplementedError()
 
@@ -9,5 +13,9 @@ class Player:
     def give_reward(self, reward):
         raise NotImplementedError()
 
+    def reset(self):
+        # called before the player sits down at another table
+        pass
+
     def set_index(self, index):
         self.index = index
@@ -1,35 +1,141 @@
 from collections import deque
 import logging
-from multiprocessing import Process
+import numpy as np
 
+from card import DeckBuffer
+from hand_history import HandHistoryWriter, HandRecord, hand_history_path, record_steps
+from metrics import get_metrics
 from seat import Seat
+from table_state import TableState
 from poker_round import Round
 from blinds import Blinds
-from itertools import count
+from turn import play_steps
+from time import perf_counter
+
+
+def icm_rewards(stacks, place_rewards):
+    # each next place goes to one of the seats not yet placed with probability
+    # proportional to its stack, so every subset of placed seats is a state
+    num_seats = len(stacks)
+    total = sum(stacks)
+    expected = [0.0] * num_seats
+    probabilities = [0.0] * (1 << num_seats)
+    probabilities[0] = 1.0
+    placed_chips = [0] * (1 << num_seats)
+
+    for placed in range(1 << num_seats):
+        probability = probabilities[placed]
+        if probability == 0.0:
+            continue
+
+        place = bin(placed).count("1")
+        if place == num_seats:
+            continue
+
+        remaining_chips = total - placed_chips[placed]
+        for seat in range(num_seats):
+            bit = 1 << seat
+            if placed & bit:
+                continue
+
+            seat_probability = probability * stacks[seat] / remaining_chips
+            expected[seat] += seat_probability * place_rewards[place]
+            probabilities[placed | bit] += seat_probability
+            placed_chips[placed | bit] = placed_chips[placed] + stacks[seat]
+
+    return expected
+
+
+def as_seed_sequence(seed):
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+
+    return np.random.SeedSequence(seed)
 
 
 class Table:
 
     LOGGER = logging.getLogger(name="Table")
 
-    def __init__(self, players, buy_in, min_denomination):
+    def __init__(self, players, buy_in, min_denomination, seed=None, history_dir=None, max_hands=None, blinds=None, all_in_equity=False):
+        if blinds is None:
+            blinds = Blinds
+
+        # an all-in settled by equity hands the shorter stack its share back,
+        # so players rarely go out and only a hand cap ends the table
+        if all_in_equity and max_hands is None:
+            raise ValueError("Settling all-ins by equity needs a hand cap")
+
         self.seats = deque()
         self.min_denomination = min_denomination
         self.player_positions = []
-        self.blind_structure = Blinds(buy_in)
+        self.history_dir = history_dir
+        self.max_hands = max_hands
+        self.all_in_equity = all_in_equity
+        self.hands_played = 0
+        self.capped = False
+
+        # decks and blinds draw from their own streams so that either can
+        # change how much randomness it uses without disturbing the other
+        self.seed_sequence = as_seed_sequence(seed)
+        deck_seed, blinds_seed = self.seed_sequence.spawn(2)
+        self.deck_buffer = DeckBuffer(np.random.default_rng(deck_seed), limit=max_hands)
+        self.blind_structure = blinds(buy_in, np.random.default_rng(blinds_seed))
 
         self.player_indices = range(len(players))
+        self.state = TableState(len(players))
 
         for player, index in zip(players, self.player_indices):
-            seat = Seat(player, index, buy_in)
+            seat = Seat(player, index, buy_in, self.state)
             self.seats.append(seat)
 
     def play(self):
+        play_steps(self.steps())
+
+    def steps(self):
         self.LOGGER.info("NEW TABLE")
+        start = perf_counter()
+
+        if self.history_dir is None:
+            yield from self.round_steps(None)
+        else:
+            with HandHistoryWriter(hand_history_path(self.history_dir, self.seed_sequence)) as history:
+                yield from self.round_steps(history)
+
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.add_table(self.hands_played, self.state.decisions, perf_counter() - start)
+
+        self.distribute_rewards()
+
+    def round_steps(self, history):
+        metrics = get_metrics()
+
         while len(self.seats) > 1:
+            if self.hands_played == self.max_hands:
+                # the survivors share the places left between them by stack
+                self.capped = True
+                break
+
             small_blind = self.blind_structure.next_round()
-            poker_round = Round(self.seats, small_blind, self.min_denomination)
-            self.seats, gone_out = poker_round.play()
+
+            if metrics is None:
+                deck = self.deck_buffer.next_deck()
+            else:
+                with metrics.timer("shuffle"):
+                    deck = self.deck_buffer.next_deck()
+
+            poker_round = Round(self.seats, small_blind, self.min_denomination, deck, self.all_in_equity)
+
+            if history is None:
+                self.seats, gone_out = yield from poker_round.steps()
+            else:
+                record = HandRecord.start(self, poker_round, self.hands_played)
+                self.seats, gone_out = yield from record_steps(poker_round.steps(), record)
+                record.payouts = poker_round.payouts
+                history.write(record)
+
+            self.hands_played += 1
 
             if gone_out:
                 self.player_positions.append(gone_out)
@@ -37,7 +143,6 @@ class Table:
             self.seats.rotate(-1)
 
         self.player_positions.append(list(self.seats))
-        self.distribute_rewards()
 
     def distribute_rewards(self):
         reward_normalizer = sum(i * i for i in self.player_indices)
@@ -47,43 +152,16 @@ class Table:
         descending_positions = reversed(self.player_positions)
 
         for position_group in descending_positions:
-            reward_sum = 0
-
-            for seat in position_group:
-                reward_sum += ungrouped_rewards.pop()
+            place_rewards = [ungrouped_rewards.pop() for _ in position_group]
 
-            reward = reward_sum / len(position_group)
+            if self.capped and position_group is self.player_positions[-1]:
+                rewards = icm_rewards([seat.chips for seat in position_group], place_rewards)
+            else:
+                rewards = [sum(place_rewards) / len(position_group)] * len(position_group)
 
-            for seat in position_group:
+            for seat, reward in zip(position_group, rewards):
                 self.give_reward(seat, reward)
 
     def give_reward(self, seat, reward):
         seat.give_reward(reward)
 
-
-class ParallelTable(Table, Process):
-
-    LOGGER = logging.getLogger(name="ParallelTable")
-
-    def __init__(self, players, buy_in, min_denomination, return_dict):
-        Table.__init__(self, players, buy_in, min_denomination)
-        Process.__init__(self)
-        self.return_dict = return_dict
-        self.players = players
-
-    def run(self):
-        self.play()
-
-    def give_reward(self, seat, reward):
-        seat.give_reward(reward)
-
-        player = seat.player
-        fitness = player.genome.GetFitness()
-        for attempt in count(1):
-            try:
-                self.return_dict[player.genome_index] = fitness
-                break
-            except ConnectionRefusedError:
-                if attempt == 10:
-                    self.LOGGER.warn("Failed to set genome {} to {}".format(player.genome_index, fitness))
-                    break
@@ -1,5 +1,6 @@
 import logging
 
+from events import log_event, subscribe
 from human_player import HumanPlayer
 from network_player import NetworkPlayer
 from poker import Table
@@ -15,6 +16,7 @@ def main():
         datefmt="%m/%d/%Y %H:%M:%S",
         level=logging.DEBUG
     )
+    subscribe(log_event)
 
     players = [HumanPlayer() for i in range(3)]
     # players.append(NetworkPlayer(None, 15, 4, 25))
@@ -1,75 +1,119 @@
 import logging
+import numpy as np
 
 from card import Deck, get_best_hand
+from equity import all_in_payouts
+from events import DealEvent, PotMoveEvent, ShowdownEvent, emit, subscribers
+from metrics import get_metrics
+from pot import settle_pots
 from collections import deque
 from betting_round import BettingRound, PreFlop
+from table_state import shared_state
+from turn import play_steps
 
 
 class Round:
 
     LOGGER = logging.getLogger(name="Round")
 
-    def __init__(self, seats, small_blind, min_denomination):
+    def __init__(self, seats, small_blind, min_denomination, deck=None, all_in_equity=False):
         self.LOGGER.debug("NEW ROUND")
         self.seats = seats
         self.small_blind = small_blind
         self.min_denomination = min_denomination
+        self.deck = deck
+        self.all_in_equity = all_in_equity
         self.cards = []
+        self.payouts = None
 
     def play(self):
+        return play_steps(self.steps())
+
+    def steps(self):
+        self.state = shared_state(self.seats)
+        self.state.start_hand([seat.index for seat in self.seats])
+
         self.shuffle_and_deal()
         self.put_in_blinds()
         starting_bet = self.small_blind * 2
         remaining_seats = self.seats
 
         first_betting_round = PreFlop(self.seats, remaining_seats, self.cards, starting_bet)
-        remaining_seats = first_betting_round.play()
+        remaining_seats = yield from first_betting_round.steps()
 
         if len(remaining_seats) == 1:
             self.distribute_winnings(remaining_seats)
             return self.get_seat_statuses()
 
+        if not self.players_can_bet(remaining_seats):
+            self.run_out(remaining_seats)
+            return self.get_seat_statuses()
+
         self.deal_flop()
-        self.LOGGER.debug("Flop  {}".format(" ".join(str(card) for card in self.cards)))
+        if subscribers:
+            emit(DealEvent("Flop", self.cards))
 
-        if self.players_can_bet(remaining_seats):
-            second_betting_round = BettingRound(self.seats, remaining_seats, self.cards)
-            remaining_seats = second_betting_round.play()
+        second_betting_round = BettingRound(self.seats, remaining_seats, self.cards)
+        remaining_seats = yield from second_betting_round.steps()
 
         if len(remaining_seats) == 1:
             self.distribute_winnings(remaining_seats)
             return self.get_seat_statuses()
 
+        if not self.players_can_bet(remaining_seats):
+            self.run_out(remaining_seats)
+            return self.get_seat_statuses()
+
         self.deal_turn()
-        self.LOGGER.debug("Turn  {}".format(" ".join(str(card) for card in self.cards)))
+        if subscribers:
+            emit(DealEvent("Turn", self.cards))
 
-        if self.players_can_bet(remaining_seats):
-            third_betting_round = BettingRound(self.seats, remaining_seats, self.cards)
-            remaining_seats = third_betting_round.play()
+        third_betting_round = BettingRound(self.seats, remaining_seats, self.cards)
+        remaining_seats = yield from third_betting_round.steps()
 
         if len(remaining_seats) == 1:
             self.distribute_winnings(remaining_seats)
             return self.get_seat_statuses()
 
+        if not self.players_can_bet(remaining_seats):
+            self.run_out(remaining_seats)
+            return self.get_seat_statuses()
+
         self.deal_river()
-        self.LOGGER.debug("River {}".format(" ".join(str(card) for card in self.cards)))
+        if subscribers:
+            emit(DealEvent("River", self.cards))
 
-        if self.players_can_bet(remaining_seats):
-            final_betting_round = BettingRound(self.seats, remaining_seats, self.cards)
-            remaining_seats = final_betting_round.play()
+        final_betting_round = BettingRound(self.seats, remaining_seats, self.cards)
+        remaining_seats = yield from final_betting_round.steps()
 
         if len(remaining_seats) == 1:
             self.distribute_winnings(remaining_seats)
             return self.get_seat_statuses()
 
-        winners = self.winners_from_remaining(remaining_seats)
+        self.showdown(remaining_seats)
+        return self.get_seat_statuses()
 
-        winner_string = ", ".join(str(winner.index) for winner in winners)
-        self.LOGGER.debug("Winning player(s): {}".format(winner_string))
+    def run_out(self, remaining_seats):
+        # nobody can bet any more, so the rest of the hand needs no players
+        if self.all_in_equity:
+            self.distribute_equity(remaining_seats)
+            return
 
-        self.distribute_winnings(winners)
+        streets = (("Flop", self.deal_flop), ("Turn", self.deal_turn), ("River", self.deal_river))
+        for street, deal in streets[max(len(self.cards) - 2, 0):]:
+            deal()
+            if subscribers:
+                emit(DealEvent(street, self.cards))
 
-        return self.get_seat_statuses()
+        self.showdown(remaining_seats)
+
+    def showdown(self, remaining_seats):
+        strengths = self.hand_strengths(remaining_seats)
+        self.distribute_winnings(remaining_seats, strengths)
+
+        if subscribers:
+            winners = self.winners_from_remaining(remaining_seats, strengths)
+            emit(ShowdownEvent([winner.index for winner in winners], self.payouts))
 
     def players_can_bet(self, remaining_seats):
         can_bet = sum(1 for seat in remaining_seats if seat.chips > 0)
@@ -82,8 +126,9 @@ class Round:
         return still_in, gone_out
 
     def shuffle_and_deal(self):
-        self.deck = Deck()
-        self.deck.shuffle()
+        if self.deck is None:
+            self.deck = Deck()
+            self.deck.shuffle()
 
         for seat in self.seats:
             seat.set_card_1(self.deck.deal())
@@ -120,43 +165,60 @@ class Round:
         # deal turn
         self.cards.append(self.deck.deal())
 
-    def winners_from_remaining(self, remaining_seats):
-        hands = []
+    def hand_strengths(self, remaining_seats):
+        metrics = get_metrics()
+        if metrics is None:
+            return [get_best_hand(seat.get_cards(), self.cards).strength for seat in remaining_seats]
 
-        for seat in remaining_seats:
-            hand = get_best_hand(seat.get_cards(), self.cards)
-            hands.append((seat, hand))
-
-        best_hand = max(hands, key=lambda seat_hand_pair: seat_hand_pair[1])
-        return [seat_hand_pair[0] for seat_hand_pair in hands if seat_hand_pair[1] == best_hand[1]]
+        with metrics.timer("get_best_hand"):
+            return [get_best_hand(seat.get_cards(), self.cards).strength for seat in remaining_seats]
 
-    def distribute_winnings(self, winners):
-        winners.sort(key=lambda seat: seat.pot)
-        winners_by_deal_order = [seat for seat in self.seats if seat in winners]
+    def winners_from_remaining(self, remaining_seats, strengths=None):
+        if strengths is None:
+            strengths = self.hand_strengths(remaining_seats)
 
-        while len(winners) > 0:
-            winner = winners[0]
-            winnings = 0
-            winnings_cap = winner.pot
+        best_strength = max(strengths)
+        return [seat for seat, strength in zip(remaining_seats, strengths) if strength == best_strength]
 
-            # create a side pot
-            for seat in self.seats:
-                winnings += seat.get_chips_from_pot(winnings_cap)
+    def distribute_winnings(self, remaining_seats, strengths=None):
+        state = self.state
 
-            # split that side pot
-            normalized_winnings = winnings // self.min_denomination
-            quotient = (normalized_winnings // len(winners)) * \
-                self.min_denomination
-            remainders = normalized_winnings % len(winners)
+        if strengths is None:
+            strengths = [0] * len(remaining_seats)
 
-            for winner in winners:
-                winner.take_winnings(quotient)
+        hand_strengths = [None] * len(state.order)
+        for seat, strength in zip(remaining_seats, strengths):
+            hand_strengths[state.positions[seat.index]] = strength
 
-            for index in range(remainders):
-                winners_by_deal_order[index].take_winnings(
-                    self.min_denomination)
+        contributions = [state.pots[index] for index in state.order]
+        self.payouts = settle_pots(contributions, hand_strengths, self.min_denomination)
+        self.pay_out()
 
-            del winners[0]
+    def distribute_equity(self, remaining_seats):
+        state = self.state
 
-        for seat in self.seats:
-            seat.reclaim_remaining_pot()
+        hands = [None] * len(state.order)
+        for seat in remaining_seats:
+            hands[state.positions[seat.index]] = seat.get_cards()
+
+        # runouts are sampled from a stream seeded by the deck itself, so a
+        # replayed hand settles exactly as it was played
+        contributions = [state.pots[index] for index in state.order]
+        self.payouts = all_in_payouts(
+            contributions,
+            hands,
+            self.cards,
+            self.deck.cards,
+            self.min_denomination,
+            rng=np.random.default_rng(self.deck.cards)
+        )
+        self.pay_out()
+
+    def pay_out(self):
+        state = self.state
+        state.pay_out(self.payouts)
+
+        if subscribers:
+            for index, payout in zip(state.order, self.payouts):
+                if payout:
+                    emit(PotMoveEvent(index, -payout))
@@ -0,0 +1,60 @@
+def settle_pots(contributions, strengths, min_denomination):
+    # contributions and strengths are both in deal order, with a strength of
+    # None for every seat that folded; returns the chips paid to each seat
+    num_seats = len(contributions)
+    payouts = [0] * num_seats
+    by_contribution = sorted(range(num_seats), key=contributions.__getitem__, reverse=True)
+
+    # walk the contribution levels from the top down, so the seats able to
+    # win each layer only ever grow and the best of them is kept as we go
+    layers = []
+    best_strength = None
+    winners = ()
+    position = 0
+
+    while position < num_seats:
+        level = contributions[by_contribution[position]]
+
+        while position < num_seats and contributions[by_contribution[position]] == level:
+            seat = by_contribution[position]
+            strength = strengths[seat]
+
+            if strength is not None:
+                if best_strength is None or strength > best_strength:
+                    best_strength = strength
+                    winners = (seat,)
+                elif strength == best_strength:
+                    winners += (seat,)
+
+            position += 1
+
+        next_level = contributions[by_contribution[position]] if position < num_seats else 0
+        if level > next_level:
+            layers.append((level - next_level, position, winners))
+
+    for layer_height, num_contributors, winners in layers:
+        amount = layer_height * num_contributors
+
+        if winners:
+            _split(amount, sorted(winners), payouts, min_denomination)
+        else:
+            # nobody left in the hand put this much in, so it goes back
+            contributors = sorted(by_contribution[:num_contributors])
+            _split(amount, contributors, payouts, min_denomination)
+
+    return payouts
+
+
+def _split(amount, winners, payouts, min_denomination):
+    normalized_amount = amount // min_denomination
+    quotient = (normalized_amount // len(winners)) * min_denomination
+    remainders = normalized_amount % len(winners)
+
+    for winner in winners:
+        payouts[winner] += quotient
+
+    # odd chips go to the winners earliest in deal order
+    for winner in winners[:remainders]:
+        payouts[winner] += min_denomination
+
+    payouts[winners[0]] += amount % min_denomination
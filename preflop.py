@@ -0,0 +1,121 @@
+from multiprocessing import Pool
+import click
+import numpy as np
+import struct
+
+from card import CARDS, DECK_SIZE, Card, card_number, card_suit, card_value
+from equity import EquityCalculator
+
+
+_preflop_table_path = "preflop_equity.bin"
+_magic = b"PFEQ"
+_header = struct.Struct("<4sHH")
+_num_numbers = len(Card.NUMBERS_INT)
+
+NUM_CLASSES = _num_numbers * _num_numbers
+MAX_OPPONENTS = 9
+
+
+def hand_class(card_1, card_2):
+    # pairs sit on the diagonal of a 13x13 grid, suited hands above it and
+    # offsuit hands below it, so every suit-isomorphic combo shares a cell
+    high = max(card_number(card_1), card_number(card_2))
+    low = min(card_number(card_1), card_number(card_2))
+
+    if card_suit(card_1) == card_suit(card_2):
+        return high * _num_numbers + low
+
+    return low * _num_numbers + high
+
+
+def class_representative(index):
+    row, column = divmod(index, _num_numbers)
+
+    if row > column:
+        return card_value(0, row), card_value(0, column)
+
+    return card_value(0, column), card_value(1, row)
+
+
+def class_name(index):
+    card_1, card_2 = class_representative(index)
+    high = CARDS[card_1].number.print_value
+    low = CARDS[card_2].number.print_value
+
+    if card_number(card_1) == card_number(card_2):
+        return high + low
+
+    suffix = "s" if card_suit(card_1) == card_suit(card_2) else "o"
+    return high + low + suffix
+
+
+_CLASS_TABLE = [
+    [hand_class(card_1, card_2) if card_1 != card_2 else None for card_2 in range(DECK_SIZE)]
+    for card_1 in range(DECK_SIZE)
+]
+
+
+class PreflopEquity:
+
+    def __init__(self, path=_preflop_table_path):
+        with open(path, "rb") as table_file:
+            magic, num_classes, max_opponents = _header.unpack(table_file.read(_header.size))
+
+        if magic != _magic or num_classes != NUM_CLASSES:
+            raise ValueError("{} is not a preflop equity table".format(path))
+
+        self.max_opponents = max_opponents
+        self.table = np.memmap(
+            path,
+            dtype="<f4",
+            mode="r",
+            offset=_header.size,
+            shape=(num_classes, max_opponents)
+        )
+
+    def equity(self, card_1, card_2, opponents):
+        opponents = min(max(opponents, 1), self.max_opponents)
+        return float(self.table[_CLASS_TABLE[card_1][card_2], opponents - 1])
+
+
+def _class_equity(args):
+    index, opponents, tolerance, seed = args
+    calculator = EquityCalculator(class_representative(index), opponents)
+    result = calculator.monte_carlo(tolerance=tolerance, processes=1, seed=seed)
+    return index, opponents, result.equity()
+
+
+def generate_table(path, tolerance, max_opponents, processes=None, seed=0):
+    table = np.zeros((NUM_CLASSES, max_opponents), dtype="<f4")
+    seeds = np.random.SeedSequence(seed).generate_state(NUM_CLASSES * max_opponents)
+    tasks = [
+        (index, opponents, tolerance, int(seeds[index * max_opponents + opponents - 1]))
+        for index in range(NUM_CLASSES)
+        for opponents in range(1, max_opponents + 1)
+    ]
+
+    with Pool(processes) as pool:
+        for index, opponents, equity in pool.imap_unordered(_class_equity, tasks):
+            table[index, opponents - 1] = equity
+
+    with open(path, "wb") as table_file:
+        table_file.write(_header.pack(_magic, NUM_CLASSES, max_opponents))
+        table_file.write(table.tobytes())
+
+
+@click.command()
+@click.option("--output", default=_preflop_table_path, help="File to write the equity table to")
+@click.option("--tolerance", default=0.002, help="Standard error to reach for each equity")
+@click.option("--max_opponents", default=MAX_OPPONENTS, help="Largest number of random opponents")
+@click.option("--processes", default=None, type=int, help="Worker processes (defaults to the CPU count)")
+@click.option("--seed", default=0, help="Seed for the Monte Carlo runouts")
+def main(output, tolerance=0.002, max_opponents=MAX_OPPONENTS, processes=None, seed=0):
+    generate_table(output, tolerance, max_opponents, processes, seed)
+
+    table = PreflopEquity(output)
+    for index in sorted(range(NUM_CLASSES), key=lambda index: -table.table[index, 0])[:5]:
+        print("{:>4s} {}".format(class_name(index), " ".join("{:.3f}".format(e) for e in table.table[index])))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,63 @@
 import logging
 
+from events import PotMoveEvent, emit, subscribers
+from table_state import TableState
+
 
 class Seat:
 
     LOGGER = logging.getLogger(name="Seat")
 
-    def __init__(self, player, index, chips):
+    def __init__(self, player, index, chips, state=None):
+        if state is None:
+            state = TableState(index + 1)
+
         self.player = player
         self.index = index
-        self.chips = chips
-        self.bet = 0
-        self.pot = 0
-        self.folded = False
+        self.state = state
+        self.card_1 = None
+        self.card_2 = None
 
+        self.state.add_seat(self, chips)
         self.player.set_index(index)
 
+    def bind(self, state):
+        # moves the seat, with its chips and anything it has put in, onto
+        # another table's state
+        previous = self.state
+        state.add_seat(self, previous.chips[self.index])
+        state.bets[self.index] = previous.bets[self.index]
+        state.pots[self.index] = previous.pots[self.index]
+        self.state = state
+
+    @property
+    def chips(self):
+        return self.state.chips[self.index]
+
+    @chips.setter
+    def chips(self, chips):
+        self.state.chips[self.index] = chips
+
+    @property
+    def bet(self):
+        return self.state.bets[self.index]
+
+    @bet.setter
+    def bet(self, bet):
+        self.state.bets[self.index] = bet
+
+    @property
+    def pot(self):
+        return self.state.pots[self.index]
+
+    @pot.setter
+    def pot(self, pot):
+        self.state.pots[self.index] = pot
+
+    @property
+    def folded(self):
+        return self.state.folded[self.index]
+
     def set_card_1(self, card_1):
         self.card_1 = card_1
 
@@ -31,30 +74,24 @@ class Seat:
         return self.player.get_action()
 
     def refresh(self):
-        self.folded = False
         self.card_1 = None
         self.card_2 = None
 
     def bet_chips(self, num_chips):
-        bet = min(self.chips, num_chips)
-        self.LOGGER.debug("Player {} puts {} chips in".format(self.index, bet))
-        self.chips -= bet
-        self.bet += bet
+        bet = self.state.bet_chips(self.index, num_chips)
+        if subscribers:
+            emit(PotMoveEvent(self.index, bet))
 
         return bet
 
     def move_bet_to_pot(self):
-        self.pot += self.bet
-        self.bet = 0
+        self.state.move_bet_to_pot(self.index)
 
     def get_chips_from_pot(self, num_chips):
-        taken = min(self.pot, num_chips)
-        self.pot -= taken
-        return taken
+        return self.state.get_chips_from_pot(self.index, num_chips)
 
     def reclaim_remaining_pot(self):
-        self.chips += self.pot
-        self.pot = 0
+        self.state.reclaim_remaining_pot(self.index)
 
     def take_winnings(self, winnings):
         self.chips += winnings
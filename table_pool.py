@@ -0,0 +1,183 @@
+from multiprocessing import Process, Queue
+from multiprocessing.sharedctypes import RawArray
+from queue import Empty
+import logging
+import numpy as np
+import os
+import traceback
+
+from card import get_hand_cache
+from lockstep import LockstepSimulator
+from metrics import get_metrics
+from network_player import NetworkBackend
+from poker import Table
+
+
+def shared_floats(size):
+    # floats in shared memory; processes forked after this write their own
+    # slots and the parent reads them all through this one view
+    return np.frombuffer(RawArray("d", size))
+
+
+def reset_forked_stats():
+    # a forked process keeps the parent's hand cache entries and metrics, but
+    # their counters should only describe the work done in this process
+    hand_cache = get_hand_cache()
+    if hand_cache is not None:
+        hand_cache.reset_stats()
+
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.reset()
+
+    return hand_cache, metrics
+
+
+class PoolTable(Table):
+
+    def __init__(self, players, buy_in, min_denomination, rewards, seed=None, history_dir=None, max_hands=None, blinds=None, all_in_equity=False):
+        Table.__init__(self, players, buy_in, min_denomination, seed, history_dir, max_hands, blinds, all_in_equity)
+
+        # rewards is the pool's shared_floats view, taking only this table's
+        # reward at each of its players' genome indices
+        self.rewards = rewards
+
+    def give_reward(self, seat, reward):
+        seat.give_reward(reward)
+        self.rewards[seat.player.genome_index] = reward
+
+
+class TablePool:
+
+    LOGGER = logging.getLogger(name="TablePool")
+
+    def __init__(self, players, buy_in, min_denomination, history_dir=None, max_hands=None, blinds=None, all_in_equity=False, processes=None):
+        # the workers are forked once with every player, phenotypes and all,
+        # and from then on are only sent chunks of tables, each table being
+        # which genome indices sit together and its seed; each table writes
+        # its players' rewards into their own slots of one shared array
+        if processes is None:
+            processes = os.cpu_count()
+
+        self.players = {player.genome_index: player for player in players}
+
+        # only the latest round's reward per genome index, which the parent
+        # adds to the genome's fitness itself
+        self.rewards = shared_floats(max(self.players) + 1)
+        self.buy_in = buy_in
+        self.min_denomination = min_denomination
+        self.history_dir = history_dir
+        self.max_hands = max_hands
+        self.blinds = blinds
+        self.all_in_equity = all_in_equity
+
+        self.assignments = Queue()
+        self.results = Queue()
+        self.workers = [Process(target=self.work, daemon=True) for _ in range(processes)]
+
+        for worker in self.workers:
+            worker.start()
+
+    def work(self):
+        # the players never change, so neither do the stacked networks the
+        # backend keeps between rounds
+        self.backend = NetworkBackend()
+
+        while True:
+            assignment = self.assignments.get()
+            if assignment is None:
+                break
+
+            number, tables = assignment
+
+            # the caches and metrics should only describe this chunk
+            hand_cache, metrics = reset_forked_stats()
+
+            try:
+                self.play_tables(tables)
+            except Exception:
+                self.results.put((number, traceback.format_exc(), None))
+                continue
+
+            if hand_cache is not None:
+                self.LOGGER.info("Hand cache {}".format(hand_cache.stats()))
+
+            self.results.put((number, None, None if metrics is None else metrics.to_dict()))
+
+    def play_tables(self, tables):
+        # a chunk's tables are played in lockstep, so the networks waiting
+        # on every table are evaluated together
+        LockstepSimulator([self.create_table(*table) for table in tables], self.backend).run()
+
+    def create_table(self, genome_indices, seed):
+        players = [self.players[genome_index] for genome_index in genome_indices]
+
+        # players stay in this process between tables, so anything a table
+        # left on them is cleared first
+        for player in players:
+            player.reset()
+
+        return PoolTable(
+            players,
+            self.buy_in,
+            self.min_denomination,
+            self.rewards,
+            seed,
+            self.history_dir,
+            self.max_hands,
+            self.blinds,
+            self.all_in_equity
+        )
+
+    def play(self, assignments):
+        # assignments are (genome indices, table seed) pairs; the returned
+        # view holds every seated genome's reward at its index, and is only
+        # valid until the next call
+        self.rewards[:] = 0
+
+        # one chunk per worker, dealt round robin to even out table sizes
+        num_chunks = min(len(self.workers), len(assignments))
+        for number in range(num_chunks):
+            tables = [(list(genome_indices), seed) for genome_indices, seed in assignments[number::num_chunks]]
+            self.assignments.put((number, tables))
+
+        metrics = get_metrics()
+
+        for _ in range(num_chunks):
+            number, error, table_metrics = self.get_result()
+            if error is not None:
+                raise RuntimeError("Table chunk {} failed in a worker:\n{}".format(number, error))
+
+            if metrics is not None:
+                metrics.merge(table_metrics)
+
+        return self.rewards
+
+    def get_result(self):
+        while True:
+            try:
+                return self.results.get(timeout=1)
+            except Empty:
+                dead = [worker for worker in self.workers if not worker.is_alive()]
+                if dead:
+                    raise RuntimeError("{} table worker(s) died, exit code {}".format(
+                        len(dead),
+                        dead[0].exitcode
+                    ))
+
+    def close(self):
+        for _ in self.workers:
+            self.assignments.put(None)
+
+        for worker in self.workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        if exception[0] is None:
+            self.close()
+        else:
+            for worker in self.workers:
+                worker.terminate()
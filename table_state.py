@@ -0,0 +1,124 @@
+def shared_state(seats):
+    # seats built without a state each get a private one; the first time
+    # they play together they are moved onto one state with room for all
+    state = seats[0].state
+    if all(seat.state is state for seat in seats):
+        return state
+
+    state = TableState(max(seat.index for seat in seats) + 1)
+    for seat in seats:
+        seat.bind(state)
+
+    return state
+
+
+class TableState:
+
+    def __init__(self, num_seats):
+        self.num_seats = num_seats
+        self.seats = [None] * num_seats
+        self.chips = [0] * num_seats
+        self.bets = [0] * num_seats
+        self.pots = [0] * num_seats
+        self.folded = [1] * num_seats
+        self.total_pot = 0
+
+        self.acting = None
+        self.turn_indicator = [0] * num_seats
+        self.decisions = 0
+
+        # seats whose players want the game state on every turn, not only
+        # when they have to act
+        self.observing = [False] * num_seats
+        self.num_observing = 0
+
+        # the seats dealt into the current hand, in deal order from the dealer
+        self.order = []
+        self.positions = [None] * num_seats
+
+        # active seats form a circular doubly linked list so that moving to the
+        # next seat and folding are both O(1)
+        self.next_active = list(range(num_seats))
+        self.previous_active = list(range(num_seats))
+        self.num_active = 0
+
+    def add_seat(self, seat, chips):
+        self.seats[seat.index] = seat
+        self.chips[seat.index] = chips
+
+        if seat.player.observes_all_turns:
+            self.observing[seat.index] = True
+            self.num_observing += 1
+
+    def start_hand(self, order):
+        self.order = order
+        num_dealt = len(order)
+
+        for position, index in enumerate(order):
+            self.positions[index] = position
+            self.folded[index] = 0
+            self.next_active[index] = order[(position + 1) % num_dealt]
+            self.previous_active[index] = order[position - 1]
+
+        self.num_active = num_dealt
+        self.total_pot = sum(self.pots[index] + self.bets[index] for index in order)
+
+    def set_acting(self, index):
+        if self.acting is not None:
+            self.turn_indicator[self.acting] = 0
+
+        self.acting = index
+        self.turn_indicator[index] = 1
+
+    def first_active(self):
+        for index in self.order:
+            if not self.folded[index]:
+                return index
+
+        return None
+
+    def active_seats(self):
+        return [self.seats[index] for index in self.order if not self.folded[index]]
+
+    def fold(self, index):
+        # the folded seat keeps its own links so that play can step on from it
+        previous_index = self.previous_active[index]
+        next_index = self.next_active[index]
+        self.next_active[previous_index] = next_index
+        self.previous_active[next_index] = previous_index
+        self.folded[index] = 1
+        self.num_active -= 1
+
+    def bet_chips(self, index, num_chips):
+        bet = min(self.chips[index], num_chips)
+        self.chips[index] -= bet
+        self.bets[index] += bet
+        self.total_pot += bet
+        return bet
+
+    def move_bet_to_pot(self, index):
+        self.pots[index] += self.bets[index]
+        self.bets[index] = 0
+
+    def move_bets_to_pots(self):
+        for index in self.order:
+            self.pots[index] += self.bets[index]
+            self.bets[index] = 0
+
+    def get_chips_from_pot(self, index, num_chips):
+        taken = min(self.pots[index], num_chips)
+        self.pots[index] -= taken
+        self.total_pot -= taken
+        return taken
+
+    def reclaim_remaining_pot(self, index):
+        self.chips[index] += self.pots[index]
+        self.total_pot -= self.pots[index]
+        self.pots[index] = 0
+
+    def pay_out(self, payouts):
+        # payouts are in deal order and between them empty every pot
+        for index, payout in zip(self.order, payouts):
+            self.chips[index] += payout
+            self.total_pot -= self.pots[index]
+            self.pots[index] = 0
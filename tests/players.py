@@ -0,0 +1,25 @@
+from action import CheckCall, Fold, Raise
+from player import Player
+
+
+class CallingPlayer(Player):
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.rewards = []
+
+    def supply_state(self, card_1, card_2, bet, game_state):
+        self.can_raise = game_state.player_chips[0] >= game_state.current_bet
+
+    def get_action(self):
+        choice = self.rng.random()
+        if choice < 0.1:
+            return Fold()
+        if choice < 0.15 and self.can_raise:
+            # more than anyone has, so it is always at least the current bet
+            return Raise(10 ** 9)
+
+        return CheckCall()
+
+    def give_reward(self, reward):
+        self.rewards.append(reward)
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from hand_history import HandHistoryReader, HandRecord, replay_hand
+from players import CallingPlayer
+from poker import Table
+
+
+def _play_table(history_dir, seed, **table_options):
+    rng = random.Random(seed)
+    players = [CallingPlayer(rng) for _ in range(6)]
+    table = Table(players, 8000, 25, seed, str(history_dir), **table_options)
+    table.play()
+    return table
+
+
+def _records(history_dir):
+    records = []
+    for path in sorted(history_dir.glob("hands-*.bin")):
+        with HandHistoryReader(str(path)) as reader:
+            records.extend(reader)
+
+    return records
+
+
+@pytest.mark.parametrize("table_options", [dict(), dict(max_hands=40, all_in_equity=True)])
+def test_every_recorded_hand_replays(tmp_path, table_options):
+    table = _play_table(tmp_path, 7, **table_options)
+    records = _records(tmp_path)
+
+    assert len(records) == table.hands_played
+    for hand_number, record in enumerate(records):
+        assert record.hand_number == hand_number
+
+        poker_round = replay_hand(record)
+        assert poker_round.payouts == record.payouts
+        assert sum(poker_round.state.chips) == sum(record.chips)
+
+
+def test_records_round_trip_through_bytes(tmp_path):
+    _play_table(tmp_path, 11)
+
+    for record in _records(tmp_path):
+        copy = HandRecord.from_bytes(record.to_bytes())
+
+        assert copy.to_bytes() == record.to_bytes()
+        assert (copy.entropy, copy.spawn_key, copy.seats, copy.chips, copy.deck) == \
+            (record.entropy, record.spawn_key, record.seats, record.chips, record.deck)
+        assert copy.actions == record.actions
+        assert copy.payouts == record.payouts
+
+
+def test_reader_rebuilds_a_missing_index(tmp_path):
+    _play_table(tmp_path, 3)
+    indexed = _records(tmp_path)
+
+    for index_path in tmp_path.glob("*.idx"):
+        index_path.unlink()
+
+    scanned = _records(tmp_path)
+    assert [record.to_bytes() for record in scanned] == [record.to_bytes() for record in indexed]
@@ -0,0 +1,45 @@
+import random
+
+from hand_history import HandHistoryReader
+from lockstep import LockstepSimulator
+from players import CallingPlayer
+from poker import Table
+
+
+def _tables(history_dir):
+    tables = []
+    for seed in range(12):
+        rng = random.Random(seed)
+        players = [CallingPlayer(rng) for _ in range(2 + seed % 7)]
+        tables.append((Table(players, 8000, 25, seed, str(history_dir)), players))
+
+    return tables
+
+
+def _payouts(history_dir):
+    payouts = dict()
+    for path in history_dir.glob("hands-*.bin"):
+        with HandHistoryReader(str(path)) as reader:
+            payouts[path.name] = [record.payouts for record in reader]
+
+    return payouts
+
+
+def test_lockstep_matches_sequential_play(tmp_path):
+    sequential_dir = tmp_path / "sequential"
+    lockstep_dir = tmp_path / "lockstep"
+    sequential_dir.mkdir()
+    lockstep_dir.mkdir()
+
+    sequential = _tables(sequential_dir)
+    for table, _ in sequential:
+        table.play()
+
+    lockstep = _tables(lockstep_dir)
+    simulator = LockstepSimulator([table for table, _ in lockstep])
+    simulator.run()
+
+    assert [[player.rewards for player in players] for _, players in lockstep] == \
+        [[player.rewards for player in players] for _, players in sequential]
+    assert _payouts(lockstep_dir) == _payouts(sequential_dir)
+    assert simulator.decisions == sum(table.state.decisions for table, _ in sequential)
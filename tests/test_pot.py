@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from pot import settle_pots
+
+
+_min_denomination = 25
+
+
+def _layered_payouts(contributions, strengths, min_denomination):
+    # a deliberately naive reference: every contribution level is its own pot
+    payouts = [0] * len(contributions)
+    levels = sorted(set(contributions))
+    previous_level = 0
+
+    for level in levels:
+        contributors = [seat for seat, contribution in enumerate(contributions) if contribution >= level]
+        amount = (level - previous_level) * len(contributors)
+        eligible = [seat for seat in contributors if strengths[seat] is not None]
+
+        if eligible:
+            best_strength = max(strengths[seat] for seat in eligible)
+            winners = [seat for seat in eligible if strengths[seat] == best_strength]
+        else:
+            winners = contributors
+
+        share = amount // min_denomination // len(winners) * min_denomination
+        for winner in winners:
+            payouts[winner] += share
+
+        leftover = amount - share * len(winners)
+        for winner in winners:
+            paid = min(leftover, min_denomination)
+            payouts[winner] += paid
+            leftover -= paid
+
+        payouts[winners[0]] += leftover
+        previous_level = level
+
+    return payouts
+
+
+def _random_settlements(seed, trials):
+    rng = np.random.default_rng(seed)
+
+    for _ in range(trials):
+        num_seats = int(rng.integers(2, 11))
+        contributions = (rng.integers(0, 12, size=num_seats) * _min_denomination * rng.integers(1, 40)).tolist()
+        strengths = rng.integers(0, 4, size=num_seats).tolist()
+        folded = rng.random(num_seats) < 0.4
+        folded[rng.integers(num_seats)] = False
+        strengths = [None if fold else strength for fold, strength in zip(folded, strengths)]
+
+        yield contributions, strengths, settle_pots(contributions, strengths, _min_denomination)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_chips_are_conserved(seed):
+    for contributions, strengths, payouts in _random_settlements(seed, 2000):
+        assert sum(payouts) == sum(contributions), (contributions, strengths, payouts)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_layered_pots(seed):
+    for contributions, strengths, payouts in _random_settlements(seed, 2000):
+        assert payouts == _layered_payouts(contributions, strengths, _min_denomination), (contributions, strengths)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_no_seat_wins_more_than_it_matched(seed):
+    for contributions, strengths, payouts in _random_settlements(seed, 2000):
+        for contribution, strength, payout in zip(contributions, strengths, payouts):
+            matched = sum(min(other, contribution) for other in contributions)
+            assert payout <= matched, (contributions, strengths, payouts)
+
+            if strength is None:
+                assert payout <= contribution, (contributions, strengths, payouts)
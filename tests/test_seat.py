@@ -0,0 +1,30 @@
+import random
+
+from players import CallingPlayer
+from poker_round import Round
+from seat import Seat
+
+
+def test_round_over_seats_built_without_a_state():
+    rng = random.Random(0)
+
+    for _ in range(50):
+        seats = [Seat(CallingPlayer(rng), index, 1000) for index in range(3)]
+        Round(seats, 25, 25).play()
+
+        assert len({id(seat.state) for seat in seats}) == 1
+        assert sum(seat.chips for seat in seats) == 3000
+        assert sum(seat.pot + seat.bet for seat in seats) == 0
+
+
+def test_seats_keep_their_chips_between_rounds():
+    rng = random.Random(1)
+    seats = [Seat(CallingPlayer(rng), index, 1000) for index in range(4)]
+
+    for _ in range(10):
+        playing = [seat for seat in seats if seat.chips > 0]
+        if len(playing) < 2:
+            break
+
+        Round(playing, 25, 25).play()
+        assert sum(seat.chips for seat in seats) == 4000
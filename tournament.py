@@ -1,72 +1,81 @@
-from multiprocessing import Manager
+from time import perf_counter
 import logging
-import random
+import numpy as np
 
+from metrics import get_metrics
 from network_player import NetworkPlayer
-from poker import ParallelTable, Table
+from poker import Table, as_seed_sequence
+from table_pool import TablePool
 
 
 class Round:
 
     LOGGER = logging.getLogger(name="Round")
 
-    def __init__(self, players, table_size, buy_in, min_denomination):
+    def __init__(self, players, table_size, pool, seed=None):
         self.players = players
         self.table_size = table_size
-        self.buy_in = buy_in
-        self.min_denomination = min_denomination
+        self.pool = pool
+        self.seed_sequence = as_seed_sequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence.spawn(1)[0])
 
     def play(self):
         self.LOGGER.info("NEW ROUND")
+        metrics = get_metrics()
 
-        with Manager() as manager:
-            fitness_dict = manager.dict()
-            tables = self.get_tables(fitness_dict)
+        player_groups = self.get_player_groups()
+        assignments = [
+            ([player.genome_index for player in player_group], self.table_seed())
+            for player_group in player_groups
+        ]
 
-            for table in tables:
-                table.start()
+        start = perf_counter()
+        rewards = self.pool.play(assignments)
 
-            for table in tables:
-                table.join()
+        if metrics is not None:
+            metrics.add_time("table_wait", perf_counter() - start)
 
-            for player in self.players:
-                fitness = fitness_dict[player.genome_index]
-                player.genome.SetFitness(fitness)
+        for player in self.players:
+            player.genome.SetFitness(player.genome.GetFitness() + rewards[player.genome_index])
 
-    def get_tables(self, fitness_dict):
+    def get_player_groups(self):
         shuffled_players = list(self.players)
-        random.shuffle(shuffled_players)
-        tables = []
+        self.rng.shuffle(shuffled_players)
+        player_groups = []
 
         # split into groups of {self.table_size}
         while len(shuffled_players) > self.table_size * 2:
-            player_group = [shuffled_players.pop() for _ in range(self.table_size)]
-            table = ParallelTable(player_group, self.buy_in, self.min_denomination, fitness_dict)
-            tables.append(table)
+            player_groups.append([shuffled_players.pop() for _ in range(self.table_size)])
 
         # split the last few into two roughly even groups
         penultimate_group_size = len(shuffled_players) // 2
-        penultimate_group = [shuffled_players.pop() for _ in range(penultimate_group_size)]
-        table = ParallelTable(penultimate_group, self.buy_in, self.min_denomination, fitness_dict)
-        tables.append(table)
+        player_groups.append([shuffled_players.pop() for _ in range(penultimate_group_size)])
+        player_groups.append(shuffled_players)
 
-        table = ParallelTable(shuffled_players, self.buy_in, self.min_denomination, fitness_dict)
-        tables.append(table)
+        return player_groups
 
-        return tables
+    def table_seed(self):
+        return self.seed_sequence.spawn(1)[0]
 
 
 class Tournament:
 
     LOGGER = logging.getLogger(name="Tournament")
 
-    def __init__(self, population, table_size, money_vector_size, buy_in, min_denomination, num_rounds):
+    def __init__(self, population, table_size, money_vector_size, buy_in, min_denomination, num_rounds, seed=None, history_dir=None, max_hands=None, blinds=None, all_in_equity=False, observe_all_turns=False, processes=None):
         self.population = population
         self.table_size = table_size
         self.money_vector_size = money_vector_size
         self.buy_in = buy_in
         self.min_denomination = min_denomination
         self.num_rounds = num_rounds
+        self.seed_sequence = as_seed_sequence(seed)
+        self.history_dir = history_dir
+        self.max_hands = max_hands
+        self.blinds = blinds
+        self.all_in_equity = all_in_equity
+        self.observe_all_turns = observe_all_turns
+        self.processes = processes
         self.create_players()
 
     def create_players(self):
@@ -74,24 +83,50 @@ class Tournament:
         num_genomes = self.population.NumGenomes()
         for genome_index in range(num_genomes):
             genome = self.population.AccessGenomeByIndex(genome_index)
-            player = NetworkPlayer(genome, self.table_size, self.money_vector_size, self.min_denomination, genome_index=genome_index)
+            player = NetworkPlayer(
+                genome,
+                self.money_vector_size,
+                self.table_size,
+                self.min_denomination,
+                genome_index=genome_index,
+                observe_all_turns=self.observe_all_turns
+            )
             self.players.append(player)
 
     def play(self):
         self.LOGGER.info("NEW TOURNAMENT")
-        for _ in range(self.num_rounds):
-            tournament_round = Round(self.players, self.table_size, self.buy_in, self.min_denomination)
-            tournament_round.play()
+        metrics = get_metrics()
+        start = perf_counter()
+
+        with self.create_pool() as pool:
+            if metrics is not None:
+                metrics.add_time("process_start", perf_counter() - start)
+
+            for round_seed in self.seed_sequence.spawn(self.num_rounds):
+                tournament_round = Round(self.players, self.table_size, pool, round_seed)
+                tournament_round.play()
 
         for player in self.players:
             player.genome.SetEvaluated()
 
+    def create_pool(self):
+        return TablePool(
+            self.players,
+            self.buy_in,
+            self.min_denomination,
+            self.history_dir,
+            self.max_hands,
+            self.blinds,
+            self.all_in_equity,
+            self.processes
+        )
+
 
 class PlayOff:
 
     LOGGER = logging.getLogger(name="PlayOff")
 
-    def __init__(self, previous_best_genomes, current_best_genomes, table_size, money_vector_size, buy_in, min_denomination, num_rounds):
+    def __init__(self, previous_best_genomes, current_best_genomes, table_size, money_vector_size, buy_in, min_denomination, num_rounds, seed=None, history_dir=None, max_hands=None, blinds=None, all_in_equity=False, observe_all_turns=False):
         self.previous_best_genomes = previous_best_genomes
         self.current_best_genomes = current_best_genomes
         self.table_size = table_size
@@ -99,6 +134,12 @@ class PlayOff:
         self.buy_in = buy_in
         self.min_denomination = min_denomination
         self.num_rounds = num_rounds
+        self.seed_sequence = as_seed_sequence(seed)
+        self.history_dir = history_dir
+        self.max_hands = max_hands
+        self.blinds = blinds
+        self.all_in_equity = all_in_equity
+        self.observe_all_turns = observe_all_turns
         self.create_players()
 
     def create_players(self):
@@ -107,12 +148,24 @@ class PlayOff:
         self.current_players = []
 
         for genome in self.previous_best_genomes:
-            player = NetworkPlayer(genome, self.table_size, self.money_vector_size, self.min_denomination)
+            player = NetworkPlayer(
+                genome,
+                self.money_vector_size,
+                self.table_size,
+                self.min_denomination,
+                observe_all_turns=self.observe_all_turns
+            )
             self.players.append(player)
             self.previous_players.append(player)
 
         for genome in self.current_best_genomes:
-            player = NetworkPlayer(genome, self.table_size, self.money_vector_size, self.min_denomination)
+            player = NetworkPlayer(
+                genome,
+                self.money_vector_size,
+                self.table_size,
+                self.min_denomination,
+                observe_all_turns=self.observe_all_turns
+            )
             self.players.append(player)
             self.current_players.append(player)
 
@@ -121,8 +174,17 @@ class PlayOff:
             player.genome.SetFitness(0)
 
         self.LOGGER.info("NEW PLAYOFF")
-        for round in range(self.num_rounds):
-            table = Table(self.players, self.buy_in, self.min_denomination)
+        for table_seed in self.seed_sequence.spawn(self.num_rounds):
+            table = Table(
+                self.players,
+                self.buy_in,
+                self.min_denomination,
+                table_seed,
+                self.history_dir,
+                self.max_hands,
+                self.blinds,
+                self.all_in_equity
+            )
             table.play()
 
         previous_genome_score = sum(player.genome.GetFitness() for player in self.previous_players)
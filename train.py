@@ -1,9 +1,16 @@
 import _MultiNEAT as NEAT
 from math import ceil, log2
 from copy import deepcopy
+from time import perf_counter
 import click
 import logging
+import numpy as np
+import os
 
+from blinds import Blinds, TurboBlinds
+from card import configure_hand_cache
+from metrics import configure_metrics
+from phenotype import configure_phenotype_cache
 from tournament import Tournament, PlayOff
 
 _action_vector_size = 3
@@ -11,17 +18,28 @@ _card_vector_size = 13 + 4
 _red = "\x1b[31m"
 _normal = "\x1b[0m"
 _genome_store = "genome/{}-{}"
+_metrics_store = "genome/{}-metrics.jsonl"
 
 
 class Training:
 
     LOGGER = logging.getLogger(name="Training")
 
-    def __init__(self, table_size, buy_in, min_denomination, tournament_rounds):
+    def __init__(self, table_size, buy_in, min_denomination, tournament_rounds, hand_cache_size=0, seed=None, history_dir=None, metrics_path=None, max_hands=None, turbo_blinds=False, all_in_equity=False, observe_all_turns=False, phenotype_cache_size=0, processes=None):
         self.table_size = table_size
         self.buy_in = buy_in
         self.min_denomination = min_denomination
         self.tournament_rounds = tournament_rounds
+        self.hand_cache_size = hand_cache_size
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.history_dir = history_dir
+        self.metrics_path = metrics_path
+        self.max_hands = max_hands
+        self.blinds = TurboBlinds if turbo_blinds else Blinds
+        self.all_in_equity = all_in_equity
+        self.observe_all_turns = observe_all_turns
+        self.phenotype_cache_size = phenotype_cache_size
+        self.processes = processes
 
         self.set_card_vector_size()
         self.set_money_vector_size()
@@ -65,7 +83,7 @@ class Training:
         size += self.money_vector_size
 
         # player chips
-        size += self.table_size * self.card_vector_size
+        size += self.table_size * self.money_vector_size
 
         # turn indicator
         size += self.table_size
@@ -107,6 +125,16 @@ class Training:
             level=logging.WARN
         )
 
+        configure_hand_cache(self.hand_cache_size)
+        phenotype_cache = configure_phenotype_cache(self.phenotype_cache_size)
+
+        if self.history_dir is not None:
+            os.makedirs(self.history_dir, exist_ok=True)
+
+        metrics = configure_metrics(self.metrics_path is not None)
+        if metrics is not None:
+            os.makedirs(os.path.dirname(self.metrics_path), exist_ok=True)
+
         genome = self.create_genome()
         population = NEAT.Population(genome, self.neat_parameters, True, 1.0, 0)
         previous_best_genomes = None
@@ -124,18 +152,39 @@ class Training:
             "improvement"
         ))
 
+        self.LOGGER.warn("Master seed: {}".format(self.seed_sequence.entropy))
+
         # run for 100 generations
         for generation in range(200):
+            tournament_seed, playoff_seed = self.seed_sequence.spawn(2)
+            generation_start = perf_counter()
+            if metrics is not None:
+                metrics.reset()
+
+            if phenotype_cache is not None:
+                phenotype_cache.reset_stats()
+
             tournament = Tournament(
                 population,
                 self.table_size,
                 self.money_vector_size,
                 self.buy_in,
                 self.min_denomination,
-                self.tournament_rounds
+                self.tournament_rounds,
+                tournament_seed,
+                self.history_dir,
+                self.max_hands,
+                self.blinds,
+                self.all_in_equity,
+                self.observe_all_turns,
+                self.processes
             )
 
-            tournament.play()
+            if metrics is None:
+                tournament.play()
+            else:
+                with metrics.timer("tournament"):
+                    tournament.play()
 
             if current_best_genomes:
                 previous_best_genomes = current_best_genomes
@@ -150,9 +199,20 @@ class Training:
                     self.money_vector_size,
                     self.buy_in,
                     self.min_denomination,
-                    self.tournament_rounds
+                    self.tournament_rounds,
+                    playoff_seed,
+                    self.history_dir,
+                    self.max_hands,
+                    self.blinds,
+                    self.all_in_equity,
+                    self.observe_all_turns
                 )
-                difference += playoff.play()
+
+                if metrics is None:
+                    difference += playoff.play()
+                else:
+                    with metrics.timer("playoff"):
+                        difference += playoff.play()
 
             for index in range(population.NumGenomes()):
                 genome = population.AccessGenomeByIndex(index)
@@ -167,7 +227,20 @@ class Training:
                 difference
             ))
 
-            population.Epoch()
+            if phenotype_cache is not None:
+                self.LOGGER.info("Phenotype cache {}".format(phenotype_cache.stats()))
+
+            if metrics is None:
+                population.Epoch()
+            else:
+                with metrics.timer("epoch"):
+                    population.Epoch()
+
+                fields = {"generation": generation}
+                if phenotype_cache is not None:
+                    fields["phenotype_cache"] = phenotype_cache.stats()
+
+                metrics.write(self.metrics_path, perf_counter() - generation_start, **fields)
 
         self.LOGGER.warn("Training complete")
         return self.get_best_n_genomes(population, self.table_size)
@@ -186,8 +259,37 @@ def _save_genomes(genomes, genome_name):
 @click.option("--buy_in", default=8000, help="Number of chips each player starts with")
 @click.option("--min_denomination", default=25, help="Minimum chip denomination")
 @click.option("--tournament_rounds", default=10, help="Number of rounds per training tournament")
-def main(genome_name, table_size=8, buy_in=8000, min_denomination=25, tournament_rounds=10):
-    training = Training(table_size, buy_in, min_denomination, tournament_rounds)
+@click.option("--hand_cache_size", default=0, help="Best hand cache entries per process (0 disables it)")
+@click.option("--seed", default=None, type=int, help="Master seed for every table's random streams")
+@click.option("--history_dir", default=None, help="Directory to record every table's hand history in")
+@click.option("--metrics", is_flag=True, help="Write per generation timings and throughput as JSONL")
+@click.option("--max_hands", default=None, type=int, help="Hands per table before the survivors are settled by stack")
+@click.option("--turbo_blinds", is_flag=True, help="Raise the blinds about twice as often")
+@click.option("--all_in_equity", is_flag=True, help="Settle all-in hands by expected share over the runouts")
+@click.option("--observe_all_turns", is_flag=True, help="Activate every network on every turn, for stateful networks")
+@click.option("--phenotype_cache_size", default=1000, help="Compiled networks kept for unchanged genomes (0 disables it)")
+@click.option("--processes", default=None, type=int, help="Table worker processes (defaults to the CPU count)")
+def main(genome_name, table_size=8, buy_in=8000, min_denomination=25, tournament_rounds=10, hand_cache_size=0, seed=None, history_dir=None, metrics=False, max_hands=None, turbo_blinds=False, all_in_equity=False, observe_all_turns=False, phenotype_cache_size=1000, processes=None):
+    if all_in_equity and max_hands is None:
+        raise click.UsageError("--all_in_equity needs --max_hands")
+
+    metrics_path = _metrics_store.format(genome_name) if metrics else None
+    training = Training(
+        table_size,
+        buy_in,
+        min_denomination,
+        tournament_rounds,
+        hand_cache_size,
+        seed,
+        history_dir,
+        metrics_path,
+        max_hands,
+        turbo_blinds,
+        all_in_equity,
+        observe_all_turns,
+        phenotype_cache_size,
+        processes
+    )
     top_genomes = training.run()
     _save_genomes(top_genomes, genome_name)
 
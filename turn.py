@@ -1,67 +1,116 @@
 import logging
 
-from collections import deque
+from events import TurnEvent, emit, subscribers
+
+
+def play_steps(steps):
+    # steps yields each seat that has to act and is sent back its action
+    try:
+        seat = next(steps)
+        while True:
+            seat = steps.send(seat.get_action())
+    except StopIteration as stop:
+        return stop.value
 
 
 class Turn:
 
     LOGGER = logging.getLogger("Turn")
 
-    def __init__(self, seats, filtered_seats, cards, current_bet, last_action):
-        self.seats = seats
-        self.filtered_seats = filtered_seats
+    def __init__(self, state, acting, cards, current_bet, last_action):
+        self.state = state
+        self.acting = acting
         self.cards = cards
         self.current_bet = current_bet
         self.last_action = last_action
 
     def play(self):
-        self.LOGGER.debug("Player {}'s go".format(self.seats[0].index))
-        self.supply_state_to_seats()
+        return play_steps(self.steps())
+
+    def steps(self):
+        if subscribers:
+            emit(TurnEvent(self.acting))
+
+        self.state.set_acting(self.acting)
+        self.supply_state_to_observers()
 
-        if self.filtered_seats[0].chips > 0:
-            return self.get_action()
+        if self.state.chips[self.acting] > 0:
+            if not self.state.observing[self.acting]:
+                self.supply_state(self.acting)
+
+            self.state.decisions += 1
+            action = yield self.state.seats[self.acting]
+            return action
         else:
             return None
 
-    def get_action(self):
-        seat = self.filtered_seats[0]
-        return seat.get_action()
+    def supply_state(self, index):
+        self.state.seats[index].supply_state(GameState(
+            self.state,
+            index,
+            self.cards,
+            self.current_bet,
+            self.last_action,
+        ))
+
+    def supply_state_to_observers(self):
+        state = self.state
+        if state.num_observing == 0:
+            return
+
+        order = state.order
+        start = state.positions[self.acting]
 
-    def supply_state_to_seats(self):
-        pot = sum(seat.pot + seat.bet for seat in self.seats)
+        for index in order[start:] + order[:start]:
+            if state.observing[index]:
+                self.supply_state(index)
 
-        player_chips = deque(seat.chips for seat in self.seats)
-        turn_indicator = deque([1] + [0] * (len(self.seats) - 1))
-        folded = deque([1 if seat not in self.filtered_seats else 0 for seat in self.seats])
 
-        for seat in self.seats:
-            seat.supply_state(GameState(
-                self.cards,
-                self.current_bet,
-                self.last_action,
-                pot,
-                player_chips,
-                turn_indicator,
-                folded,
-            ))
+class SeatView:
 
-            player_chips.rotate(-1)
-            turn_indicator.rotate(-1)
-            folded.rotate(-1)
+    # a read-only view of a per-seat array from one seat's perspective, so
+    # index 0 is always the viewing seat and the rest follow in deal order
+    __slots__ = ("values", "order", "start")
 
-    def get_turn_indicator(self, seat):
-        turn_indicator = [False] * len(self.seats)
-        turn_indicator[(seat.index - self.seats[0].index) % len(self.seats)] = True
-        return turn_indicator
+    def __init__(self, values, order, start):
+        self.values = values
+        self.order = order
+        self.start = start
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, offset):
+        order = self.order
+        return self.values[order[(self.start + offset) % len(order)]]
+
+    def __iter__(self):
+        values = self.values
+        for index in self.order[self.start:]:
+            yield values[index]
+
+        for index in self.order[:self.start]:
+            yield values[index]
 
 
 class GameState:
 
-    def __init__(self, cards, current_bet, last_action, pot, player_chips, turn_indicator, folded):
+    def __init__(self, state, index, cards, current_bet, last_action):
         self.cards = cards
         self.current_bet = current_bet
         self.last_action = last_action
-        self.pot = pot
-        self.player_chips = player_chips
-        self.turn_indicator = turn_indicator
-        self.folded = folded
+        self.pot = state.total_pot
+        self.state = state
+        self.start = state.positions[index]
+
+    @property
+    def player_chips(self):
+        return SeatView(self.state.chips, self.state.order, self.start)
+
+    @property
+    def turn_indicator(self):
+        return SeatView(self.state.turn_indicator, self.state.order, self.start)
+
+    @property
+    def folded(self):
+        return SeatView(self.state.folded, self.state.order, self.start)